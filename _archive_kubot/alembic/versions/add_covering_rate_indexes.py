@@ -0,0 +1,63 @@
+"""Add covering indexes for latest-rate lookups
+
+Revision ID: add_covering_rate_indexes
+Revises: add_performance_indexes
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_covering_rate_indexes'
+down_revision = 'add_performance_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add covering indexes so latest-rate queries become index-only scans."""
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        # latest_by_code: DISTINCT ON (bank_id) ... WHERE code = ? ORDER BY bank_id, fetched_at DESC
+        op.create_index(
+            'ix_bank_rates_code_bank_fetched',
+            'bank_rates',
+            ['code', 'bank_id', sa.text('fetched_at DESC')],
+            unique=False,
+            # id makes latest_by_code's DISTINCT ON (bank_id) subquery index-only
+            postgresql_include=['id', 'buy', 'sell'],
+            postgresql_concurrently=True
+        )
+
+        # get_latest_by_code / get_by_code_and_date: WHERE code = ? ORDER BY rate_date DESC, fetched_at DESC
+        op.create_index(
+            'ix_cbu_rates_code_date_fetched',
+            'cbu_rates',
+            ['code', sa.text('rate_date DESC'), sa.text('fetched_at DESC')],
+            unique=False,
+            postgresql_include=['rate'],
+            postgresql_concurrently=True
+        )
+
+        # Superseded by ix_cbu_rates_code_date_fetched
+        op.drop_index(
+            'ix_cbu_rates_code_date',
+            table_name='cbu_rates',
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    """Restore the previous cbu_rates index and remove the covering ones."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_cbu_rates_code_date',
+            'cbu_rates',
+            ['code', sa.text('rate_date DESC')],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.drop_index('ix_cbu_rates_code_date_fetched', table_name='cbu_rates', postgresql_concurrently=True)
+        op.drop_index('ix_bank_rates_code_bank_fetched', table_name='bank_rates', postgresql_concurrently=True)
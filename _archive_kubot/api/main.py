@@ -36,7 +36,7 @@ if SENTRY_DSN:
 # Import our core models and infrastructure
 from core.models import User, Bank, BankRate
 from core.repos import UserRepository, BankRatesRepo
-from infrastructure.db import get_session, init_db
+from infrastructure.db import get_session, get_ro_session, init_db
 from api.utils.telegram_auth import verify_init_data
 
 app = FastAPI(title="KUBot API", version="1.0.0")
@@ -199,7 +199,7 @@ async def set_lang(
 @app.get("/api/rates", response_model=List[RateResponse])
 async def get_rates(
     codes: str = Query(..., description="Comma-separated currency codes (e.g., USD,EUR,RUB)"),
-    db: AsyncSession = Depends(get_session)
+    db: AsyncSession = Depends(get_ro_session)
 ):
     """Get latest CBU rates for specified currency codes."""
     # Validate and parse codes
@@ -255,7 +255,7 @@ async def get_bank_rates(
     code: str = Query(..., description="Currency code (USD, EUR, RUB)"),
     limit: int = Query(10, ge=1, le=50, description="Number of results (1-50)"),
     order: Literal["sell_desc", "sell_asc", "buy_desc", "buy_asc"] = Query("sell_desc"),
-    db: AsyncSession = Depends(get_session)
+    db: AsyncSession = Depends(get_ro_session)
 ):
     """Get latest bank rates for a currency, ordered by sell rate."""
     # Validate currency code
@@ -312,12 +312,12 @@ async def get_bank_rates(
 
 # Legacy endpoints for backward compatibility
 @app.get("/rates")
-async def get_rates_legacy(db: AsyncSession = Depends(get_session)):
+async def get_rates_legacy(db: AsyncSession = Depends(get_ro_session)):
     """Legacy endpoint - get all rates."""
     return await get_rates(codes="USD,EUR,RUB", db=db)
 
 @app.get("/banks")
-async def get_banks(db: AsyncSession = Depends(get_session)):
+async def get_banks(db: AsyncSession = Depends(get_ro_session)):
     """Get all banks."""
     stmt = select(Bank).order_by(Bank.name)
     result = await db.execute(stmt)
@@ -5,6 +5,7 @@ import os
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
+from collections import defaultdict
 from decimal import Decimal
 
 from aiogram import Bot
@@ -20,6 +21,7 @@ logger = logging.getLogger(__name__)
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 BOT = None  # Will be initialized when needed
 BATCH_SIZE = 500  # Send messages in batches to avoid rate limits
+SUBSCRIBER_CHUNK_SIZE = 1000  # Subscribers loaded from the database at a time
 
 
 def get_bot() -> Bot:
@@ -160,6 +162,75 @@ async def get_daily_rates_data() -> Dict[str, Any]:
     return {}
 
 
+async def _send_digest_group(
+    lang: str,
+    tg_ids: List[int],
+    rates_data: Dict[str, Any],
+    messages: Dict[str, str],
+    stats: Dict[str, Any],
+) -> None:
+    """Send the digest to one chunk's users of a single language, in batches."""
+    logger.info(f"🌐 Processing {len(tg_ids)} users for language: {lang}")
+    
+    # Render message once per language
+    message_text = messages.get(lang)
+    if message_text is None:
+        message_text = messages[lang] = render_digest_for_lang(lang, rates_data)
+    
+    stats["total_users"] += len(tg_ids)
+    lang_stats = stats["languages"].setdefault(lang, {
+        "total": 0,
+        "successful": 0,
+        "failed": 0,
+        "blocked": 0
+    })
+    lang_stats["total"] += len(tg_ids)
+    
+    # Send in batches to manage rate limits
+    for i in range(0, len(tg_ids), BATCH_SIZE):
+        batch = tg_ids[i:i + BATCH_SIZE]
+        
+        # Small pause between batches to be nice to Telegram API
+        if stats["batches_processed"]:
+            await asyncio.sleep(1)
+        
+        logger.info(f"📦 Processing batch {stats['batches_processed'] + 1} for {lang} ({len(batch)} users)")
+        
+        # Send messages concurrently within batch
+        tasks = [
+            send_message_safe(
+                chat_id=uid,
+                text=message_text,
+                disable_web_page_preview=True,
+                parse_mode="HTML"
+            )
+            for uid in batch
+        ]
+        
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Process results and handle blocked users
+        async with get_session_context() as session:
+            users_repo = UserRepository(session)
+            
+            for uid, success in zip(batch, results):
+                if success is True:
+                    stats["successful_sends"] += 1
+                    lang_stats["successful"] += 1
+                else:
+                    stats["failed_sends"] += 1
+                    lang_stats["failed"] += 1
+                    
+                    # If user blocked bot, soft unsubscribe them
+                    if isinstance(success, Exception):
+                        logger.info(f"🚫 Soft unsubscribing blocked user: {uid}")
+                        await users_repo.soft_unsubscribe(uid)
+                        stats["blocked_users"] += 1
+                        lang_stats["blocked"] += 1
+        
+        stats["batches_processed"] += 1
+
+
 async def send_daily_digest() -> Dict[str, Any]:
     """Send daily digest to all subscribed users, grouped by language."""
     start_time = datetime.now()
@@ -182,88 +253,43 @@ async def send_daily_digest() -> Dict[str, Any]:
             logger.warning("⚠️ No rates data available for digest")
             return stats
         
-        # Get subscribers grouped by language
-        groups = {}
+        logger.info("📨 Starting digest send")
+        messages: Dict[str, str] = {}
+        
+        # Stream subscribers in chunks; the next chunk is fetched while the
+        # current one is being sent
         async with get_session_context() as session:
             users_repo = UserRepository(session)
-            groups = await users_repo.get_subscribers_grouped_by_lang()
+            chunks = users_repo.iter_subscribed_users(chunk=SUBSCRIBER_CHUNK_SIZE)
+            next_chunk = asyncio.ensure_future(anext(chunks, None))
+            try:
+                while (chunk := await next_chunk) is not None:
+                    next_chunk = asyncio.ensure_future(anext(chunks, None))
+                    
+                    groups = defaultdict(list)
+                    for tg_user_id, lang in chunk:
+                        groups[lang].append(tg_user_id)
+                    
+                    for lang, tg_ids in groups.items():
+                        await _send_digest_group(lang, tg_ids, rates_data, messages, stats)
+            finally:
+                # Let a pending prefetch unwind before closing the generator
+                next_chunk.cancel()
+                await asyncio.gather(next_chunk, return_exceptions=True)
+                await chunks.aclose()
         
-        if not groups:
+        if not stats["total_users"]:
             logger.info("📭 No subscribed users found")
             return stats
         
-        total_users = sum(len(tg_ids) for tg_ids in groups.values())
-        stats["total_users"] = total_users
-        
-        logger.info(f"📨 Starting digest send to {total_users} users in {len(groups)} languages")
-        
-        # Process each language group
-        for lang, tg_ids in groups.items():
-            logger.info(f"🌐 Processing {len(tg_ids)} users for language: {lang}")
-            
-            # Render message for this language
-            message_text = render_digest_for_lang(lang, rates_data)
-            
-            # Initialize language stats
-            stats["languages"][lang] = {
-                "total": len(tg_ids),
-                "successful": 0,
-                "failed": 0,
-                "blocked": 0
-            }
-            
-            # Send in batches to manage rate limits
-            for i in range(0, len(tg_ids), BATCH_SIZE):
-                batch = tg_ids[i:i + BATCH_SIZE]
-                batch_num = (i // BATCH_SIZE) + 1
-                total_batches = (len(tg_ids) + BATCH_SIZE - 1) // BATCH_SIZE
-                
-                logger.info(f"📦 Processing batch {batch_num}/{total_batches} for {lang} ({len(batch)} users)")
-                
-                # Send messages concurrently within batch
-                tasks = [
-                    send_message_safe(
-                        chat_id=uid,
-                        text=message_text,
-                        disable_web_page_preview=True,
-                        parse_mode="HTML"
-                    )
-                    for uid in batch
-                ]
-                
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # Process results and handle blocked users
-                async with get_session_context() as session:
-                    users_repo = UserRepository(session)
-                    
-                    for uid, success in zip(batch, results):
-                        if success is True:
-                            stats["successful_sends"] += 1
-                            stats["languages"][lang]["successful"] += 1
-                        else:
-                            stats["failed_sends"] += 1
-                            stats["languages"][lang]["failed"] += 1
-                            
-                            # If user blocked bot, soft unsubscribe them
-                            if isinstance(success, Exception):
-                                logger.info(f"🚫 Soft unsubscribing blocked user: {uid}")
-                                await users_repo.soft_unsubscribe(uid)
-                                stats["blocked_users"] += 1
-                                stats["languages"][lang]["blocked"] += 1
-                
-                stats["batches_processed"] += 1
-                
-                # Small pause between batches to be nice to Telegram API
-                if i + BATCH_SIZE < len(tg_ids):  # Don't sleep after last batch
-                    await asyncio.sleep(1)
-        
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
         
         stats["completed_at"] = end_time.isoformat()
         stats["duration_seconds"] = duration
         
+        # The user count is only known once the stream is drained
+        logger.info(f"📨 Digest sent to {stats['total_users']} users in {len(stats['languages'])} languages")
         logger.info(
             f"✅ Digest sending completed in {duration:.1f}s. "
             f"Success: {stats['successful_sends']}/{stats['total_users']}, "
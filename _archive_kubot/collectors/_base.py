@@ -0,0 +1,113 @@
+"""
+Shared Collector Engine
+
+Persists the rates fetched by an individual bank collector. Each bank
+module only supplies its config dict and fetch coroutine; bank lookup,
+bulk insert and commit live here once. Also owns the thread pool the
+requests-based collectors run their blocking fetches on, and the parsing
+helpers the HTML scrapers share.
+"""
+
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+from core.repos import BankRatesRepo, get_or_create_bank_id
+from infrastructure.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Dedicated pool for blocking HTTP fetches, kept off the loop's default executor
+FETCH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="bank-fetch")
+
+# Thousands separators and (narrow) no-break spaces, dropped in one C-level pass
+_NUM_STRIP = str.maketrans('', '', ', \t\xa0\u202f')
+
+
+def parse_number(text: str) -> Optional[float]:
+    """Parse a rate like "12 080" or "16,229.57". Returns None if it isn't one."""
+    try:
+        return float(text.translate(_NUM_STRIP))
+    except ValueError:
+        return None
+
+
+def make_soup(markup: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """Parse markup with lxml, or the pure-Python parser when lxml isn't installed."""
+    try:
+        return BeautifulSoup(markup, 'lxml', parse_only=parse_only)
+    except FeatureNotFound:
+        return BeautifulSoup(markup, 'html.parser', parse_only=parse_only)
+
+
+class PageMemo:
+    """Digest of the last parsed page and its rates; an unchanged page skips the parse."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._hash: Optional[bytes] = None
+        self._rates: List[Tuple[str, float, float]] = []
+    
+    async def parse(
+        self,
+        page: str,
+        parser: Callable[[str], List[Tuple[str, float, float]]],
+    ) -> List[Tuple[str, float, float]]:
+        """Return the cached rates for an unchanged page, else parse it off the event loop."""
+        page_hash = hashlib.blake2b(page.encode(), digest_size=16).digest()
+        if page_hash == self._hash:
+            logger.info("♻️ %s page unchanged, reusing %d parsed rates", self.name, len(self._rates))
+            return list(self._rates)
+        
+        rates = await asyncio.to_thread(parser, page)
+        if rates:
+            self._hash, self._rates = page_hash, rates
+        return rates
+
+
+async def save_rates(config: Dict[str, str], rates: List[Tuple[str, float, float]]) -> int:
+    """Save rates for the bank described by config. Returns number of rows written."""
+    async with SessionLocal() as session:
+        repo = BankRatesRepo(session)
+        
+        try:
+            bank_id = await get_or_create_bank_id(
+                repo,
+                slug=config["slug"],
+                name=config["name"],
+                region=config.get("region"),
+                website=config.get("website"),
+            )
+            saved_count = await repo.add_rates(bank_id, rates)
+            await session.commit()
+            logger.info(f"✅ {config['name']}: saved {saved_count} rates to database")
+            return saved_count
+            
+        except Exception as e:
+            logger.error(f"❌ {config['name']}: database error: {e}", exc_info=True)
+            await session.rollback()
+            return 0
+
+
+async def run_collector(
+    config: Dict[str, str],
+    fetcher: Callable[[], Awaitable[List[Tuple[str, float, float]]]],
+) -> int:
+    """Fetch a bank's rates and persist them. Returns count saved."""
+    try:
+        logger.info(f"Starting {config['name']} collection...")
+        rates = await fetcher()
+        
+        if not rates:
+            logger.warning(f"⚠️ {config['name']}: no rates collected")
+            return 0
+        
+        return await save_rates(config, rates)
+        
+    except Exception as e:
+        logger.error(f"❌ {config['name']} collection failed: {e}")
+        return 0
@@ -0,0 +1,62 @@
+"""
+Shared HTTP Client
+
+One keep-alive httpx.AsyncClient for every async bank collector, so
+polls reuse open TCP/TLS connections instead of handshaking each cycle,
+plus the semaphore that caps in-flight bank requests and the requests
+session factory for the collectors that still fetch synchronously.
+"""
+
+import asyncio
+import os
+from typing import Dict, Optional
+
+import certifi
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+# Caps in-flight bank requests when collectors run together
+FETCH_SEMAPHORE = asyncio.Semaphore(int(os.getenv("COLLECTOR_CONCURRENCY", "8")))
+
+_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
+# Every content coding urllib3 can decode here (br/zstd when the
+# brotli/zstandard packages are installed) so pages come over compressed
+_ACCEPT_ENCODING = make_headers(accept_encoding=True)['accept-encoding']
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide HTTP client, creating it on first use."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            timeout=httpx.Timeout(20.0, connect=5.0),
+            # Idle connections outlive a poll burst; hosts are resolved once per connection
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60),
+            follow_redirects=True,
+        )
+    return _HTTP_CLIENT
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client; called on collector shutdown."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is not None:
+        await _HTTP_CLIENT.aclose()
+        _HTTP_CLIENT = None
+
+
+def make_session(headers: Dict[str, str]) -> requests.Session:
+    """
+    Build a keep-alive requests.Session for a sync collector.
+
+    Created once at module level, so the TCP/TLS connection survives
+    between scheduler ticks.
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=1))
+    session.headers.update({'Accept-Encoding': _ACCEPT_ENCODING, **headers})
+    session.verify = certifi.where()
+    return session
@@ -14,7 +14,7 @@ logger = logging.getLogger(__name__)
 CBU_URL = "https://cbu.uz/oz/arkhiv-kursov-valyut/json/"
 
 # Supported currency codes we want to track
-SUPPORTED_CURRENCIES = {"USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"}
+SUPPORTED_CURRENCIES = frozenset({"USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"})
 
 
 @retry(
@@ -60,10 +60,12 @@ async def collect_cbu_rates():
             if not cbu_bank:
                 logger.warning("CBU bank not found in database. Rates will only be stored in cbu_rates table.")
             
-            # Process each rate record
+            # Validate each rate record; both tables are written in one batch below
             successful_inserts = 0
             failed_inserts = 0
             fetched_at = datetime.now(timezone.utc)
+            cbu_rows = []
+            bank_rows = []
             
             for row in data:
                 try:
@@ -80,31 +82,33 @@ async def collect_cbu_rates():
                         logger.warning(f"Invalid rate for {code}: {rate}")
                         continue
                     
-                    # Store in cbu_rates table (original functionality)
-                    await cbu_repo.upsert_rate(
-                        code=code,
-                        rate=rate,
-                        date_str=date_str,
-                        fetched_at=fetched_at
-                    )
+                    # Queue for the cbu_rates table (original functionality)
+                    cbu_rows.append((code, rate, date_str, fetched_at))
                     
-                    # Also store in bank_rates table for TWA compatibility
+                    # Also queue for bank_rates table for TWA compatibility
                     if cbu_bank:
-                        await bank_repo.add_rate(
-                            bank_id=cbu_bank.id,  # type: ignore
-                            code=code,
-                            buy=rate,  # CBU official rates - buy/sell are the same
-                            sell=rate
-                        )
+                        # CBU official rates - buy/sell are the same
+                        bank_rows.append((code, rate, rate))
                     
-                    successful_inserts += 1
-                    logger.debug(f"Stored {code}: {rate}")
+                    logger.debug(f"Queued {code}: {rate}")
                     
                 except Exception as e:
                     failed_inserts += 1
                     logger.error(f"Failed to process CBU row {row}: {e}")
                     continue
             
+            # Upsert cbu_rates and append bank_rates in a single transaction
+            try:
+                written = await cbu_repo.bulk_upsert_rates(cbu_rows, commit=False)
+                if cbu_bank:
+                    await bank_repo.add_rates(cbu_bank.id, bank_rows)  # type: ignore
+                await session.commit()
+                successful_inserts = written
+            except Exception as e:
+                await session.rollback()
+                failed_inserts += len(cbu_rows)
+                logger.error(f"Failed to store {len(cbu_rows)} CBU rates: {e}", exc_info=True)
+            
             logger.info(
                 f"CBU rates collection completed: "
                 f"{successful_inserts} successful, {failed_inserts} failed"
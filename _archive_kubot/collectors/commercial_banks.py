@@ -25,16 +25,17 @@ import httpx
 import json
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import logging
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import re
 
+from collectors._base import FETCH_POOL
 from core.repos import BankRatesRepo
 from infrastructure.db import SessionLocal
 
 logger = logging.getLogger(__name__)
 
 # Supported currency codes we want to track (matching CBU collector)
-SUPPORTED_CURRENCIES = {"USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"}
+SUPPORTED_CURRENCIES = frozenset({"USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"})
 
 # Bank configurations with their API endpoints and parsing methods
 BANK_CONFIGS = {
@@ -130,8 +131,8 @@ async def _fetch_bank_data(bank_slug: str, url: str, method: str) -> Optional[Di
     # Use requests library for ALL banks (more reliable than httpx)
     try:
         # Run sync requests in executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, _fetch_with_requests_sync, bank_slug, url, method)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(FETCH_POOL, _fetch_with_requests_sync, bank_slug, url, method)
         return result
     except Exception as e:
         logger.error(f"Failed to fetch data from {bank_slug}: {e}")
@@ -174,11 +175,17 @@ def _parse_ipoteka_rates(data: Dict) -> List[Tuple[str, float, float]]:
     return rates
 
 
+# Restrict BS4 to the nodes the Kapitalbank parser reads; the table
+# strainer is only used by the fallback path
+_KAPITALBANK_BOX_STRAINER = SoupStrainer('div', class_='kapitalbank_currency_tablo_rate_box')
+_TABLE_STRAINER = SoupStrainer('table')
+
+
 def _parse_kapitalbank_rates(html: str) -> List[Tuple[str, float, float]]:
     """Parse Kapitalbank rates from HTML scraping."""
     rates = []
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = BeautifulSoup(html, 'html.parser', parse_only=_KAPITALBANK_BOX_STRAINER)
         
         # Kapitalbank uses specific div structure for rates
         # Structure: <div class="kapitalbank_currency_tablo_rate_box">
@@ -227,6 +234,7 @@ def _parse_kapitalbank_rates(html: str) -> List[Tuple[str, float, float]]:
         # If no rates found with primary method, try fallback to tables
         if not rates:
             logger.warning(f"Kapitalbank: Primary parsing failed (found {len(rate_boxes)} boxes but 0 rates), trying table fallback")
+            soup = BeautifulSoup(html, 'html.parser', parse_only=_TABLE_STRAINER)
             tables = soup.find_all('table')
             for table in tables:
                 rows = table.find_all('tr')
@@ -445,15 +453,14 @@ async def collect_bank_rates(bank_slug: str) -> Dict:
             # Ensure bank exists
             bank_id = await _ensure_bank_exists(repo, config)
             
-            # Add rates
-            for code, buy, sell in rates:
-                try:
-                    await repo.add_rate(bank_id, code, buy, sell)
-                    result["rates_collected"] += 1
-                    logger.debug(f"Stored {bank_slug} {code}: buy={buy}, sell={sell}")
-                except Exception as e:
-                    result["errors"].append(f"Failed to store {code}: {e}")
-                    logger.error(f"Failed to store {bank_slug} {code}: {e}")
+            # Add rates in one batch
+            try:
+                result["rates_collected"] = await repo.add_rates(bank_id, rates)
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                result["errors"].append(f"Failed to store rates: {e}")
+                logger.error(f"Failed to store {bank_slug} rates: {e}")
         
         result["success"] = True
         logger.info(f"✅ {bank_slug}: collected {result['rates_collected']} rates")
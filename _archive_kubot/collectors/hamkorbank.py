@@ -9,36 +9,34 @@ import asyncio
 import logging
 from typing import List, Tuple
 
-import requests
+from collectors._base import FETCH_POOL, run_collector
+from collectors._http import make_session
 
-from core.repos import BankRatesRepo
-from infrastructure.db import SessionLocal
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-SUPPORTED_CURRENCIES = ["USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"]
+SUPPORTED_CURRENCIES = frozenset({"USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"})
 
 HAMKORBANK_CONFIG = {
     "name": "Hamkorbank",
     "slug": "hamkorbank",
     "api_url": "https://api-dbo.hamkorbank.uz/webflow/v1/exchanges",
-    "website": "https://hamkorbank.uz"
+    "website": "https://hamkorbank.uz",
+    "region": "Commercial"
+}
+
+
+_HEADERS_JSON = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'application/json',
+    'Referer': 'https://hamkorbank.uz/',
 }
 
+_SESSION = make_session(_HEADERS_JSON)
+
 
 def fetch_json_sync() -> dict:
     """Fetch Hamkorbank exchange rates from API."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'application/json',
-        'Referer': 'https://hamkorbank.uz/',
-    }
-    
-    response = requests.get(HAMKORBANK_CONFIG["api_url"], headers=headers, timeout=20)
+    response = _SESSION.get(HAMKORBANK_CONFIG["api_url"], timeout=20)
     response.raise_for_status()
     logger.info(f"✅ Fetched JSON response: {response.status_code}")
     return response.json()
@@ -49,8 +47,8 @@ async def fetch_hamkorbank_rates() -> List[Tuple[str, float, float]]:
     logger.info(f"🏦 Fetching Hamkorbank rates from API")
     
     try:
-        loop = asyncio.get_event_loop()
-        data = await loop.run_in_executor(None, fetch_json_sync)
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(FETCH_POOL, fetch_json_sync)
         
         rates = parse_hamkorbank_json(data)
         logger.info(f"✅ Parsed {len(rates)} rates from Hamkorbank API")
@@ -80,7 +78,8 @@ def parse_hamkorbank_json(data: dict) -> List[Tuple[str, float, float]]:
     
     try:
         # Log the data structure for debugging
-        logger.info(f"� JSON keys: {list(data.keys()) if isinstance(data, dict) else 'not a dict'}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("JSON keys: %s", list(data.keys()) if isinstance(data, dict) else 'not a dict')
         
         # Handle different possible JSON structures
         exchanges = []
@@ -96,47 +95,48 @@ def parse_hamkorbank_json(data: dict) -> List[Tuple[str, float, float]]:
         elif isinstance(data, list):
             exchanges = data
         
-        logger.info(f"📊 Found {len(exchanges)} exchange entries")
+        logger.debug("Found %d exchange entries", len(exchanges))
         
         # Track unique currencies (avoid duplicates from different destination_codes)
         seen_currencies = set()
         
         for item in exchanges:
+            # Cheap pre-checks skip malformed items; only the numeric
+            # conversion below can raise
+            code = item.get('currency_char', '').upper()
+            
+            if not code or code not in SUPPORTED_CURRENCIES:
+                continue
+            
+            # Filter for branch rates (destination_code="2") to avoid duplicates  
+            if item.get('destination_code', '') != '2':
+                continue
+            
+            # Skip if already processed
+            if code in seen_currencies:
+                continue
+            seen_currencies.add(code)
+            
+            # Extract buy and sell rates (values are in UZS * 100)
+            buy_rate_raw = item.get('buying_rate')
+            sell_rate_raw = item.get('selling_rate')
+            if buy_rate_raw is None or sell_rate_raw is None:
+                continue
+            
             try:
-                # Extract currency code
-                code = item.get('currency_char', '').upper()
-                
-                if not code or code not in SUPPORTED_CURRENCIES:
-                    continue
-                
-                # Filter for branch rates (destination_code="2") to avoid duplicates  
-                dest_code = item.get('destination_code', '')
-                if dest_code != '2':
-                    continue
-                
-                # Skip if already processed
-                if code in seen_currencies:
-                    continue
-                seen_currencies.add(code)
-                
-                # Extract buy and sell rates (values are in UZS * 100)
-                buy_rate_raw = item.get('buying_rate')
-                sell_rate_raw = item.get('selling_rate')
-                
-                if buy_rate_raw is not None and sell_rate_raw is not None:
-                    # Convert from UZS*100 to UZS (e.g., 1208000 → 12080.0)
-                    buy_rate = float(buy_rate_raw) / 100.0
-                    sell_rate = float(sell_rate_raw) / 100.0
-                    
-                    # Sanity check
-                    if 0 < buy_rate < 1_000_000 and 0 < sell_rate < 1_000_000:
-                        rates.append((code, buy_rate, sell_rate))
-                        logger.info(f"💰 {code}: buy={buy_rate}, sell={sell_rate}")
-                    else:
-                        logger.warning(f"⚠️ Invalid rates for {code}: buy={buy_rate}, sell={sell_rate}")
-                        
+                # Convert from UZS*100 to UZS (e.g., 1208000 → 12080.0)
+                buy_rate = float(buy_rate_raw) / 100.0
+                sell_rate = float(sell_rate_raw) / 100.0
             except (ValueError, TypeError) as e:
-                logger.warning(f"⚠️ Failed to parse exchange item: {e}")
+                logger.warning("⚠️ Failed to parse exchange item: %s", e)
+                continue
+            
+            # Sanity check
+            if 0 < buy_rate < 1_000_000 and 0 < sell_rate < 1_000_000:
+                rates.append((code, buy_rate, sell_rate))
+                logger.debug("%s: buy=%s, sell=%s", code, buy_rate, sell_rate)
+            else:
+                logger.warning("⚠️ Invalid rates for %s: buy=%s, sell=%s", code, buy_rate, sell_rate)
                     
     except Exception as e:
         logger.error(f"❌ Error parsing Hamkorbank JSON: {e}", exc_info=True)
@@ -144,63 +144,9 @@ def parse_hamkorbank_json(data: dict) -> List[Tuple[str, float, float]]:
     return rates
 
 
-async def save_rates_to_db(rates: List[Tuple[str, float, float]]) -> None:
-    """Save rates to database."""
-    if not rates:
-        logger.warning("⚠️ No rates to save")
-        return
-    
-    async with SessionLocal() as session:
-        repo = BankRatesRepo(session)
-        
-        try:
-            bank = await repo.get_bank_by_slug(HAMKORBANK_CONFIG["slug"])
-            if not bank:
-                bank = await repo.create_bank(
-                    name=HAMKORBANK_CONFIG["name"],
-                    slug=HAMKORBANK_CONFIG["slug"],
-                    region="Commercial",
-                    website=HAMKORBANK_CONFIG["website"]
-                )
-                logger.info(f"✅ Created bank: {bank.name}")
-            
-            saved_count = 0
-            for currency_code, buy_rate, sell_rate in rates:
-                try:
-                    await repo.add_rate(
-                        bank_id=bank.id,  # type: ignore
-                        code=currency_code,
-                        buy=buy_rate,
-                        sell=sell_rate
-                    )
-                    saved_count += 1
-                except Exception as e:
-                    logger.error(f"❌ Failed to save {currency_code} rate: {e}")
-            
-            await session.commit()
-            logger.info(f"✅ Saved {saved_count}/{len(rates)} rates to database")
-            
-        except Exception as e:
-            logger.error(f"❌ Database error: {e}", exc_info=True)
-            await session.rollback()
-
-
 async def collect():
     """Main collection function."""
-    try:
-        logger.info("Starting Hamkorbank collection...")
-        rates = await fetch_hamkorbank_rates()
-        
-        if rates:
-            await save_rates_to_db(rates)
-            return len(rates)
-        else:
-            logger.warning("No rates collected")
-            return 0
-            
-    except Exception as e:
-        logger.error(f"❌ Collection failed: {e}")
-        return 0
+    return await run_collector(HAMKORBANK_CONFIG, fetch_hamkorbank_rates)
 
 
 if __name__ == "__main__":
@@ -1,45 +1,49 @@
 """
 Ipoteka Bank Exchange Rates Collector
 
-Collects exchange rates from Ipoteka Bank using JSON API.
+Collects exchange rates from Ipoteka Bank by scraping its HTML currency page.
 Uses requests library for reliable HTTP handling.
 """
 
 import asyncio
 import logging
+import re
 from typing import List, Tuple
-import json
 
-import requests
-import certifi
+from selectolax.lexbor import LexborHTMLParser
 
-from core.repos import BankRatesRepo
-from infrastructure.db import SessionLocal
+from collectors._base import FETCH_POOL, run_collector
+from collectors._http import make_session
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-SUPPORTED_CURRENCIES = ["USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"]
+SUPPORTED_CURRENCIES = frozenset({"USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"})
 
 IPOTEKA_CONFIG = {
     "name": "Ipoteka Bank",
     "slug": "ipoteka",
     "url": "https://www.ipotekabank.uz/currency/",
-    "website": "https://www.ipotekabank.uz"
+    "website": "https://www.ipotekabank.uz",
+    "region": "Commercial"
 }
 
+# Matched one table row at a time so a row without spans can't borrow the
+# next row's numbers: <b>CCY</b>, then the buy and sell <span>s after it
+_ROW_RE = re.compile(r'<tr\b[^>]*>(.*?)</tr>', re.DOTALL | re.IGNORECASE)
+_CODE_RE = re.compile(r'<b>\s*([A-Za-z]{3})\s*</b>', re.IGNORECASE)
+_SPAN_RE = re.compile(r'<span[^>]*>([\d\s,.]+)</span>', re.IGNORECASE)
+
+_HEADERS_HTML = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+}
+
+_SESSION = make_session(_HEADERS_HTML)
+
 
 def fetch_html_sync() -> str:
     """Fetch Ipoteka Bank HTML page using requests library (sync)."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-    }
-    
-    response = requests.get(IPOTEKA_CONFIG["url"], headers=headers, timeout=20, verify=certifi.where())
+    response = _SESSION.get(IPOTEKA_CONFIG["url"], timeout=20)
     response.raise_for_status()
     logger.info(f"✅ Fetched {len(response.text)} chars, status={response.status_code}")
     
@@ -51,8 +55,8 @@ async def fetch_ipoteka_rates() -> List[Tuple[str, float, float]]:
     logger.info(f"🏦 Fetching Ipoteka rates from {IPOTEKA_CONFIG['url']}")
     
     try:
-        loop = asyncio.get_event_loop()
-        html = await loop.run_in_executor(None, fetch_html_sync)
+        loop = asyncio.get_running_loop()
+        html = await loop.run_in_executor(FETCH_POOL, fetch_html_sync)
         
         rates = parse_ipoteka_html(html)
         logger.info(f"✅ Parsed {len(rates)} rates from Ipoteka")
@@ -81,46 +85,77 @@ def parse_ipoteka_html(html: str) -> List[Tuple[str, float, float]]:
     rates = []
     seen_currencies = set()
     
+    for row in _ROW_RE.finditer(html):
+        row_html = row.group(1)
+        code_match = _CODE_RE.search(row_html)
+        if code_match is None:
+            continue
+        code = code_match.group(1).upper()
+        if code not in SUPPORTED_CURRENCIES or code in seen_currencies:
+            continue
+        spans = _SPAN_RE.findall(row_html, code_match.end())[:2]
+        if len(spans) < 2:
+            continue
+        try:
+            buy_rate = float(re.sub(r'[\s,]', '', spans[0]))
+            sell_rate = float(re.sub(r'[\s,]', '', spans[1]))
+        except ValueError:
+            continue
+        if buy_rate > 0 and sell_rate > 0:
+            rates.append((code, buy_rate, sell_rate))
+            seen_currencies.add(code)
+    
+    if rates:
+        return rates
+    
+    # Layout changed — fall back to a full DOM walk
+    return _parse_ipoteka_dom(html)
+
+
+def _parse_ipoteka_dom(html: str) -> List[Tuple[str, float, float]]:
+    """Parse Ipoteka Bank HTML by walking the DOM (fallback for parse_ipoteka_html)."""
+    rates = []
+    seen_currencies = set()
+    
     try:
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = LexborHTMLParser(html)
         
-        # Find all <b> tags (currency codes)
-        currency_tags = soup.find_all('b')
-        logger.info(f"🔍 Found {len(currency_tags)} <b> tags")
+        # Find all <b> tags inside table cells (currency codes)
+        currency_tags = tree.css('td > b')
+        logger.debug("Found %d <b> tags", len(currency_tags))
         
         for tag in currency_tags:
             try:
-                code = tag.get_text(strip=True).upper()
+                code = tag.text(strip=True).upper()
                 if not code or code not in SUPPORTED_CURRENCIES or code in seen_currencies:
                     continue
                 
-                # Find parent <td> and then siblings
-                td = tag.find_parent('td')
-                if not td:
+                td = tag.parent
+                if td is None:
                     continue
                 
                 # Get next two <td> siblings for buy and sell rates
                 next_tds = []
-                sibling = td.find_next_sibling('td')
-                while sibling and len(next_tds) < 2:
-                    next_tds.append(sibling)
-                    sibling = sibling.find_next_sibling('td')
+                sibling = td.next
+                while sibling is not None and len(next_tds) < 2:
+                    if sibling.tag == 'td':
+                        next_tds.append(sibling)
+                    sibling = sibling.next
                 
                 if len(next_tds) < 2:
-                    logger.debug(f"Not enough sibling <td> for {code}")
+                    logger.debug("Not enough sibling <td> for %s", code)
                     continue
                 
                 # Extract rates from spans
-                buy_span = next_tds[0].find('span')
-                sell_span = next_tds[1].find('span')
+                buy_span = next_tds[0].css_first('span')
+                sell_span = next_tds[1].css_first('span')
                 
                 if not buy_span or not sell_span:
-                    logger.debug(f"Missing spans for {code}")
+                    logger.debug("Missing spans for %s", code)
                     continue
                 
-                buy_str = buy_span.get_text(strip=True).replace(' ', '').replace(',', '')
-                sell_str = sell_span.get_text(strip=True).replace(' ', '').replace(',', '')
+                buy_str = buy_span.text(strip=True).replace(' ', '').replace(',', '')
+                sell_str = sell_span.text(strip=True).replace(' ', '').replace(',', '')
                 
                 try:
                     buy_rate = float(buy_str)
@@ -129,14 +164,14 @@ def parse_ipoteka_html(html: str) -> List[Tuple[str, float, float]]:
                     if buy_rate > 0 and sell_rate > 0:
                         rates.append((code, buy_rate, sell_rate))
                         seen_currencies.add(code)
-                        logger.debug(f"{code}: buy={buy_rate}, sell={sell_rate}")
+                        logger.debug("%s: buy=%s, sell=%s", code, buy_rate, sell_rate)
                         
                 except ValueError as e:
-                    logger.debug(f"Failed to parse {code} rates: buy={buy_str}, sell={sell_str}, error={e}")
+                    logger.debug("Failed to parse %s rates: buy=%s, sell=%s, error=%s", code, buy_str, sell_str, e)
                     continue
                     
             except Exception as e:
-                logger.debug(f"Failed to parse currency tag: {e}")
+                logger.debug("Failed to parse currency tag: %s", e)
                 continue
                     
     except Exception as e:
@@ -148,63 +183,9 @@ def parse_ipoteka_html(html: str) -> List[Tuple[str, float, float]]:
 
 
 
-async def save_rates_to_db(rates: List[Tuple[str, float, float]]) -> None:
-    """Save rates to database."""
-    if not rates:
-        logger.warning("⚠️ No rates to save")
-        return
-    
-    async with SessionLocal() as session:
-        repo = BankRatesRepo(session)
-        
-        try:
-            bank = await repo.get_bank_by_slug(IPOTEKA_CONFIG["slug"])
-            if not bank:
-                bank = await repo.create_bank(
-                    name=IPOTEKA_CONFIG["name"],
-                    slug=IPOTEKA_CONFIG["slug"],
-                    region="Commercial",
-                    website=IPOTEKA_CONFIG["website"]
-                )
-                logger.info(f"✅ Created bank: {bank.name}")
-            
-            saved_count = 0
-            for currency_code, buy_rate, sell_rate in rates:
-                try:
-                    await repo.add_rate(
-                        bank_id=bank.id,  # type: ignore
-                        code=currency_code,
-                        buy=buy_rate,
-                        sell=sell_rate
-                    )
-                    saved_count += 1
-                except Exception as e:
-                    logger.error(f"❌ Failed to save {currency_code} rate: {e}")
-            
-            await session.commit()
-            logger.info(f"✅ Saved {saved_count}/{len(rates)} rates to database")
-            
-        except Exception as e:
-            logger.error(f"❌ Database error: {e}", exc_info=True)
-            await session.rollback()
-
-
 async def collect():
     """Main collection function."""
-    try:
-        logger.info("Starting Ipoteka collection...")
-        rates = await fetch_ipoteka_rates()
-        
-        if rates:
-            await save_rates_to_db(rates)
-            return len(rates)
-        else:
-            logger.warning("No rates collected")
-            return 0
-            
-    except Exception as e:
-        logger.error(f"❌ Collection failed: {e}")
-        return 0
+    return await run_collector(IPOTEKA_CONFIG, fetch_ipoteka_rates)
 
 
 if __name__ == "__main__":
@@ -7,44 +7,43 @@ Uses requests library for reliable HTTP handling (httpx has Brotli decompression
 
 import asyncio
 import logging
+import re
 from typing import List, Tuple
 from datetime import datetime
 
-import requests
-import certifi
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 
-from core.repos import BankRatesRepo
-from infrastructure.db import SessionLocal
+from collectors._base import FETCH_POOL, run_collector
+from collectors._http import make_session
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-SUPPORTED_CURRENCIES = ["USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"]
+SUPPORTED_CURRENCIES = frozenset({"USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"})
+
+_CURRENCY_RE = re.compile('|'.join(sorted(SUPPORTED_CURRENCIES)))
 
 KAPITALBANK_CONFIG = {
     "name": "Kapitalbank",
     "slug": "kapitalbank",
     "url": "https://kapitalbank.uz/en/services/exchange-rates/",
-    "website": "https://kapitalbank.uz"
+    "website": "https://kapitalbank.uz",
+    "region": "National"
+}
+
+_HEADERS_HTML = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9,ru;q=0.8',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
 }
 
+_SESSION = make_session(_HEADERS_HTML)
+
 
 def fetch_html_sync() -> str:
     """Fetch Kapitalbank HTML page using requests library (sync)."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.9,ru;q=0.8',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
-    
-    response = requests.get(KAPITALBANK_CONFIG["url"], headers=headers, timeout=20, verify=certifi.where())
+    response = _SESSION.get(KAPITALBANK_CONFIG["url"], timeout=20)
     response.raise_for_status()
     logger.info(f"✅ Fetched {len(response.text)} chars, encoding={response.encoding}")
     return response.text
@@ -61,8 +60,8 @@ async def fetch_kapitalbank_rates() -> List[Tuple[str, float, float]]:
     
     try:
         # Run sync request in executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        html = await loop.run_in_executor(None, fetch_html_sync)
+        loop = asyncio.get_running_loop()
+        html = await loop.run_in_executor(FETCH_POOL, fetch_html_sync)
         
         # Parse HTML
         rates = parse_kapitalbank_html(html)
@@ -88,45 +87,48 @@ def parse_kapitalbank_html(html: str) -> List[Tuple[str, float, float]]:
     rates = []
     
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = LexborHTMLParser(html)
         
         # Find visible container (In branches rates)
-        kb_container = soup.find('div', id='kb-currency-rates-data')
+        kb_container = tree.css_first('div#kb-currency-rates-data')
         if not kb_container:
-            logger.warning(f"⚠️ kb-currency-rates-data container not found")
+            logger.warning("⚠️ kb-currency-rates-data container not found")
+            if logger.isEnabledFor(logging.DEBUG):
+                # Single pass over the page instead of one scan per currency
+                logger.debug("Currency codes present in page: %s", sorted(set(_CURRENCY_RE.findall(html))))
             return []
         
         # Find all rate boxes in visible container
-        rate_boxes = kb_container.find_all('div', class_='kapitalbank_currency_tablo_rate_box')
-        logger.info(f"🔍 Found {len(rate_boxes)} rate boxes in kb-currency-rates-data")
+        rate_boxes = kb_container.css('div.kapitalbank_currency_tablo_rate_box')
+        logger.debug("Found %d rate boxes in kb-currency-rates-data", len(rate_boxes))
         
-        if len(rate_boxes) == 0:
-            logger.warning(f"⚠️ No rate boxes found in container")
+        if not rate_boxes:
+            logger.warning("⚠️ No rate boxes found in container")
             return []
         
         for box in rate_boxes:
             try:
                 # Find currency code
-                code_div = box.find('div', class_='kapitalbank_currency_tablo_type_box')
+                code_div = box.css_first('div.kapitalbank_currency_tablo_type_box')
                 if not code_div:
                     continue
                     
-                code = code_div.text.strip().upper()
+                code = code_div.text(strip=True).upper()
                 if code not in SUPPORTED_CURRENCIES:
                     continue
                 
                 # Find rate value (only one value per box now)
-                value_div = box.find('div', class_='kapitalbank_currency_tablo_type_value')
+                value_div = box.css_first('div.kapitalbank_currency_tablo_type_value')
                 if not value_div:
                     continue
-                rate = float(value_div.text.strip().replace(' ', '').replace(',', '.'))
+                rate = float(value_div.text(strip=True).replace(' ', '').replace(',', '.'))
                 
                 # Use same rate for buy and sell (Kapitalbank shows single rate per currency)
                 rates.append((code, rate, rate))
-                logger.info(f"💰 {code}: {rate} (single rate)")
+                logger.debug("%s: %s (single rate)", code, rate)
                 
             except Exception as e:
-                logger.error(f"Error parsing rate box: {e}")
+                logger.debug("Failed to parse rate box: %s", e)
                 continue
         
     except Exception as e:
@@ -135,73 +137,9 @@ def parse_kapitalbank_html(html: str) -> List[Tuple[str, float, float]]:
     return rates
 
 
-async def save_rates_to_db(rates: List[Tuple[str, float, float]]) -> None:
-    """
-    Save rates to database.
-    
-    Args:
-        rates: List of (currency_code, buy_rate, sell_rate) tuples
-    """
-    if not rates:
-        logger.warning("⚠️ No rates to save")
-        return
-    
-    async with SessionLocal() as session:
-        repo = BankRatesRepo(session)
-        
-        try:
-            # Ensure bank exists
-            bank = await repo.get_bank_by_slug(KAPITALBANK_CONFIG["slug"])
-            if not bank:
-                bank = await repo.create_bank(
-                    name=KAPITALBANK_CONFIG["name"],
-                    slug=KAPITALBANK_CONFIG["slug"],
-                    region="National",
-                    website=KAPITALBANK_CONFIG["website"]
-                )
-                logger.info(f"✅ Created bank: {bank.name}")
-            
-            # Save each rate
-            saved_count = 0
-            for currency_code, buy_rate, sell_rate in rates:
-                try:
-                    await repo.add_rate(
-                        bank_id=bank.id,  # type: ignore
-                        code=currency_code,
-                        buy=buy_rate,
-                        sell=sell_rate
-                    )
-                    saved_count += 1
-                except Exception as e:
-                    logger.error(f"❌ Failed to save {currency_code} rate: {e}")
-            
-            await session.commit()
-            logger.info(f"✅ Saved {saved_count}/{len(rates)} rates to database")
-            
-        except Exception as e:
-            logger.error(f"❌ Database error: {e}", exc_info=True)
-            await session.rollback()
-
-
 async def collect():
     """Main collection function."""
-    try:
-        logger.info("Starting Kapitalbank collection...")
-        
-        # Fetch and parse rates
-        rates = await fetch_kapitalbank_rates()
-        
-        # Save to database
-        if rates:
-            await save_rates_to_db(rates)
-            return len(rates)
-        else:
-            logger.warning("No rates collected")
-            return 0
-            
-    except Exception as e:
-        logger.error(f"❌ Collection failed: {e}")
-        return 0
+    return await run_collector(KAPITALBANK_CONFIG, fetch_kapitalbank_rates)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import os
+import signal
 import sys
 from pathlib import Path
 from datetime import datetime, timedelta
@@ -15,15 +16,10 @@ from sentry_sdk.integrations.logging import LoggingIntegration
 
 from infrastructure.db import init_db
 from cbu import collect_cbu_rates
+from collectors._http import close_http_client
 
-# Import individual bank collectors
-from kapitalbank import collect as collect_kapitalbank
-from nbu import collect as collect_nbu
-from ipoteka import collect as collect_ipoteka
-from hamkorbank import collect as collect_hamkorbank
-from tbc import collect as collect_tbc
-from turonbank import collect as collect_turonbank
-from universal import collect as collect_universal
+# Individual bank collectors, run concurrently
+from runner import collect_all as collect_all_banks
 
 
 async def cleanup_old_rates():
@@ -73,12 +69,17 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def health_monitor():
-    """Periodic health monitoring and heartbeat logging for collectors."""
+async def health_monitor(stop: asyncio.Event):
+    """Periodic health monitoring and heartbeat logging for collectors; exits when stop is set."""
     heartbeat_count = 0
     while True:
         try:
-            await asyncio.sleep(300)  # Every 5 minutes
+            try:
+                # Every 5 minutes, or return immediately on shutdown
+                await asyncio.wait_for(stop.wait(), timeout=300)
+                break
+            except asyncio.TimeoutError:
+                pass
             heartbeat_count += 1
             
             # Heartbeat log with service information
@@ -108,6 +109,12 @@ async def main():
     logger.info("📊 Starting KUBot Collectors...")
     logger.info(f"Collector startup time: {datetime.now().isoformat()}")
     
+    # Park main() on an event until SIGINT/SIGTERM instead of polling
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
     try:
         # Initialize database
         await init_db()
@@ -121,7 +128,11 @@ async def main():
             collect_cbu_rates,
             IntervalTrigger(minutes=30),
             id='cbu_rates_collector',
-            name='CBU Rates Collector'
+            name='CBU Rates Collector',
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=60,
+            replace_existing=True,
         )
 
         # Add daily retention cleanup at 03:00 Tashkent time
@@ -134,54 +145,16 @@ async def main():
             coalesce=True,
         )
         
-        # Add individual bank collectors (every 15 minutes each, staggered)
-        scheduler.add_job(
-            collect_kapitalbank,
-            IntervalTrigger(minutes=15),
-            id='kapitalbank_collector',
-            name='Kapitalbank Collector'
-        )
-        
-        scheduler.add_job(
-            collect_nbu,
-            IntervalTrigger(minutes=15),
-            id='nbu_collector',
-            name='NBU Collector'
-        )
-        
-        scheduler.add_job(
-            collect_ipoteka,
-            IntervalTrigger(minutes=15),
-            id='ipoteka_collector',
-            name='Ipoteka Collector'
-        )
-        
+        # Add individual bank collectors (every 15 minutes, run concurrently)
         scheduler.add_job(
-            collect_hamkorbank,
+            collect_all_banks,
             IntervalTrigger(minutes=15),
-            id='hamkorbank_collector',
-            name='Hamkorbank Collector'
-        )
-        
-        scheduler.add_job(
-            collect_tbc,
-            IntervalTrigger(minutes=15),
-            id='tbc_collector',
-            name='TBC Collector'
-        )
-        
-        scheduler.add_job(
-            collect_turonbank,
-            IntervalTrigger(minutes=15),
-            id='turonbank_collector',
-            name='Turonbank Collector'
-        )
-        
-        scheduler.add_job(
-            collect_universal,
-            IntervalTrigger(minutes=15),
-            id='universal_collector',
-            name='Universal Collector'
+            id='bank_collectors',
+            name='Bank Collectors',
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=60,
+            replace_existing=True,
         )
         
         # Start scheduler
@@ -189,40 +162,39 @@ async def main():
         logger.info("✅ Scheduler started with CBU + Individual Bank collectors")
         
         # Start health monitoring
-        asyncio.create_task(health_monitor())
+        asyncio.create_task(health_monitor(stop))
         logger.info("✅ Health monitoring started")
         
         # Run initial collections
         logger.info("🔄 Running initial rate collections...")
         
-        # Run CBU collection first
-        await collect_cbu_rates()
-        
-        # Run all individual bank collections in parallel
-        await asyncio.gather(
-            collect_kapitalbank(),
-            collect_nbu(),
-            collect_ipoteka(),
-            collect_hamkorbank(),
-            collect_tbc(),
-            collect_turonbank(),
-            collect_universal(),
-            return_exceptions=True  # Don't let one failure stop others
+        # CBU and the individual banks hit independent hosts; run them together
+        results = await asyncio.gather(
+            collect_cbu_rates(),
+            collect_all_banks(),
+            return_exceptions=True,
         )
+        for name, result in zip(("CBU", "Bank"), results):
+            if isinstance(result, BaseException):
+                logger.error(f"❌ Initial {name} collection failed: {result}")
         
         # Keep running
         logger.info("🚀 Collectors are now running (CBU + 7 commercial banks: Kapitalbank, NBU, Ipoteka, Hamkorbank, TBC, Turonbank, Universal)...")
         try:
-            while True:
-                await asyncio.sleep(1)
-        except KeyboardInterrupt:
+            await stop.wait()
             logger.info("🛑 Shutting down...")
         finally:
-            scheduler.shutdown()
+            scheduler.shutdown(wait=False)
+            await close_http_client()
             
     except Exception as e:
         logger.error(f"Error starting collectors: {e}")
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file
@@ -2,52 +2,60 @@
 National Bank of Uzbekistan (NBU) Exchange Rates Collector
 
 Collects exchange rates from NBU's official website.
-Uses requests library for reliable HTTP handling.
+Uses the shared async HTTP client and FETCH_SEMAPHORE from collectors._http.
 """
 
 import asyncio
 import logging
+import re
 from typing import List, Tuple
 from datetime import datetime
 
-import requests
-from bs4 import BeautifulSoup
+import httpx
+from tenacity import retry, stop_after_attempt, wait_exponential_jitter, retry_if_exception_type
+from bs4 import SoupStrainer
 
-from core.repos import BankRatesRepo
-from infrastructure.db import SessionLocal
+from collectors._base import PageMemo, make_soup, parse_number, run_collector
+from collectors._http import FETCH_SEMAPHORE, get_http_client
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-SUPPORTED_CURRENCIES = ["USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"]
+SUPPORTED_CURRENCIES = frozenset({"USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"})
 
 NBU_CONFIG = {
     "name": "National Bank of Uzbekistan",
     "slug": "nbu",
     "url": "https://nbu.uz/en/for-individuals-exchange-rates/",
-    "website": "https://nbu.uz"
+    "website": "https://nbu.uz",
+    "region": "National"
 }
 
 
-def fetch_html_sync() -> str:
-    """Fetch NBU HTML page using requests library (sync)."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.9,ru;q=0.8',
-        'Connection': 'keep-alive',
-    }
-    
-    response = requests.get(NBU_CONFIG["url"], headers=headers, timeout=20)
+_HEADERS_HTML = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9,ru;q=0.8',
+}
+
+
+@retry(
+    wait=wait_exponential_jitter(initial=0.5, max=5),
+    stop=stop_after_attempt(3),
+    retry=retry_if_exception_type(httpx.HTTPError),
+    reraise=True
+)
+async def fetch_html() -> str:
+    """Fetch NBU HTML page over the shared keep-alive client."""
+    async with FETCH_SEMAPHORE:
+        response = await get_http_client().get(NBU_CONFIG["url"], headers=_HEADERS_HTML)
     response.raise_for_status()
     logger.info(f"✅ Fetched {len(response.text)} chars, encoding={response.encoding}")
     return response.text
 
 
+_PAGE_MEMO = PageMemo("NBU")
+
+
 async def fetch_nbu_rates() -> List[Tuple[str, float, float]]:
     """
     Fetch NBU exchange rates.
@@ -58,14 +66,10 @@ async def fetch_nbu_rates() -> List[Tuple[str, float, float]]:
     logger.info(f"🏦 Fetching NBU rates from {NBU_CONFIG['url']}")
     
     try:
-        # Run sync request in executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        html = await loop.run_in_executor(None, fetch_html_sync)
+        html = await fetch_html()
         
-        # Parse HTML
-        rates = parse_nbu_html(html)
+        rates = await _PAGE_MEMO.parse(html, parse_nbu_html)
         logger.info(f"✅ Parsed {len(rates)} rates from NBU")
-        
         return rates
             
     except Exception as e:
@@ -73,6 +77,13 @@ async def fetch_nbu_rates() -> List[Tuple[str, float, float]]:
         return []
 
 
+# The rate <option>s all live inside <select> elements; slicing those out
+# first keeps BS4 from tokenizing the rest of the page
+_SELECT_RE = re.compile(r'<select\b[^>]*>.*?</select>', re.DOTALL | re.IGNORECASE)
+
+_RATE_OPTION_STRAINER = SoupStrainer('option', attrs={'data-buy': True, 'data-sell': True})
+
+
 def parse_nbu_html(html: str) -> List[Tuple[str, float, float]]:
     """
     Parse NBU HTML to extract exchange rates.
@@ -90,52 +101,40 @@ def parse_nbu_html(html: str) -> List[Tuple[str, float, float]]:
     seen_currencies = set()  # Track unique currencies to avoid duplicates
     
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        selects = _SELECT_RE.findall(html)
+        markup = ''.join(selects) if selects else html
+        
+        soup = make_soup(markup, parse_only=_RATE_OPTION_STRAINER)
         
         # Find all <option> elements with currency data
-        options = soup.find_all('option', attrs={'data-buy': True, 'data-sell': True})
+        options = soup.select('option[data-buy][data-sell][value]')
         logger.info(f"🔍 Found {len(options)} option elements with rate data")
         
         for option in options:
-            try:
-                code_raw = option.get('value')
-                if not code_raw or not isinstance(code_raw, str):
-                    continue
-                code = code_raw.upper()
-                if code not in SUPPORTED_CURRENCIES:
-                    continue
-                
-                # Skip if we've already seen this currency
-                if code in seen_currencies:
-                    continue
-                
-                # Get buy/sell rates from data attributes
-                buy_raw = option.get('data-buy', '')
-                sell_raw = option.get('data-sell', '')
-                buy_str = str(buy_raw).replace(' ', '').replace(',', '') if buy_raw else ''
-                sell_str = str(sell_raw).replace(' ', '').replace(',', '') if sell_raw else ''
-                
-                # Skip if either is missing or "-"
-                if not buy_str or not sell_str or buy_str == '-' or sell_str == '-':
-                    logger.debug(f"Skipping {code}: incomplete rates (buy={buy_str}, sell={sell_str})")
-                    continue
-                
-                try:
-                    buy_rate = float(buy_str)
-                    sell_rate = float(sell_str)
-                    
-                    if buy_rate > 0 and sell_rate > 0:
-                        rates.append((code, buy_rate, sell_rate))
-                        seen_currencies.add(code)
-                        logger.debug(f"{code}: buy={buy_rate}, sell={sell_rate}")
-                        
-                except ValueError as e:
-                    logger.debug(f"Failed to parse {code} rates: {e}")
-                    continue
-                    
-            except Exception as e:
-                logger.debug(f"Failed to parse option: {e}")
+            code = option['value'].upper()
+            if code not in SUPPORTED_CURRENCIES:
+                continue
+            
+            # Skip if we've already seen this currency
+            if code in seen_currencies:
                 continue
+            
+            # Get buy/sell rates from data attributes; missing or "-" parses to None
+            buy_rate = parse_number(option['data-buy'])
+            sell_rate = parse_number(option['data-sell'])
+            
+            if buy_rate is None or sell_rate is None:
+                logger.debug("Skipping %s: incomplete rates (buy=%s, sell=%s)", code, option['data-buy'], option['data-sell'])
+                continue
+            
+            if buy_rate > 0 and sell_rate > 0:
+                rates.append((code, buy_rate, sell_rate))
+                seen_currencies.add(code)
+                logger.debug("%s: buy=%s, sell=%s", code, buy_rate, sell_rate)
+                
+                # The page repeats the same options in several selects
+                if len(seen_currencies) == len(SUPPORTED_CURRENCIES):
+                    break
                     
     except Exception as e:
         logger.error(f"❌ Error parsing NBU HTML: {e}", exc_info=True)
@@ -143,73 +142,9 @@ def parse_nbu_html(html: str) -> List[Tuple[str, float, float]]:
     return rates
 
 
-async def save_rates_to_db(rates: List[Tuple[str, float, float]]) -> None:
-    """
-    Save rates to database.
-    
-    Args:
-        rates: List of (currency_code, buy_rate, sell_rate) tuples
-    """
-    if not rates:
-        logger.warning("⚠️ No rates to save")
-        return
-    
-    async with SessionLocal() as session:
-        repo = BankRatesRepo(session)
-        
-        try:
-            # Ensure bank exists
-            bank = await repo.get_bank_by_slug(NBU_CONFIG["slug"])
-            if not bank:
-                bank = await repo.create_bank(
-                    name=NBU_CONFIG["name"],
-                    slug=NBU_CONFIG["slug"],
-                    region="National",
-                    website=NBU_CONFIG["website"]
-                )
-                logger.info(f"✅ Created bank: {bank.name}")
-            
-            # Save each rate
-            saved_count = 0
-            for currency_code, buy_rate, sell_rate in rates:
-                try:
-                    await repo.add_rate(
-                        bank_id=bank.id,  # type: ignore
-                        code=currency_code,
-                        buy=buy_rate,
-                        sell=sell_rate
-                    )
-                    saved_count += 1
-                except Exception as e:
-                    logger.error(f"❌ Failed to save {currency_code} rate: {e}")
-            
-            await session.commit()
-            logger.info(f"✅ Saved {saved_count}/{len(rates)} rates to database")
-            
-        except Exception as e:
-            logger.error(f"❌ Database error: {e}", exc_info=True)
-            await session.rollback()
-
-
 async def collect():
     """Main collection function."""
-    try:
-        logger.info("Starting NBU collection...")
-        
-        # Fetch and parse rates
-        rates = await fetch_nbu_rates()
-        
-        # Save to database
-        if rates:
-            await save_rates_to_db(rates)
-            return len(rates)
-        else:
-            logger.warning("No rates collected")
-            return 0
-            
-    except Exception as e:
-        logger.error(f"❌ Collection failed: {e}")
-        return 0
+    return await run_collector(NBU_CONFIG, fetch_nbu_rates)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,55 @@
+"""
+Bank Collectors Runner
+
+Runs every individual bank collector concurrently under one event loop,
+so a collection cycle takes as long as the slowest bank instead of the
+sum of all of them.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Union
+
+from kapitalbank import collect as collect_kapitalbank
+from nbu import collect as collect_nbu
+from ipoteka import collect as collect_ipoteka
+from hamkorbank import collect as collect_hamkorbank
+from tbc import collect as collect_tbc
+from turonbank import collect as collect_turonbank
+from universal import collect as collect_universal
+
+logger = logging.getLogger(__name__)
+
+BANK_COLLECTORS = {
+    "kapitalbank": collect_kapitalbank,
+    "nbu": collect_nbu,
+    "ipoteka": collect_ipoteka,
+    "hamkorbank": collect_hamkorbank,
+    "tbc": collect_tbc,
+    "turonbank": collect_turonbank,
+    "universal": collect_universal,
+}
+
+
+async def collect_all() -> Dict[str, Union[int, BaseException]]:
+    """
+    Run all bank collectors concurrently; one failure does not stop the others.
+    
+    In-flight fetches are already capped by FETCH_SEMAPHORE (COLLECTOR_CONCURRENCY)
+    and FETCH_POOL, so the collectors themselves are not throttled here.
+    """
+    results = await asyncio.gather(
+        *(collect() for collect in BANK_COLLECTORS.values()),
+        return_exceptions=True,
+    )
+    summary = dict(zip(BANK_COLLECTORS, results))
+    
+    for slug, result in summary.items():
+        if isinstance(result, BaseException):
+            logger.error(f"❌ {slug} collector raised: {result}")
+    
+    return summary
+
+
+if __name__ == "__main__":
+    asyncio.run(collect_all())
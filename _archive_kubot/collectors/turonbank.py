@@ -2,43 +2,51 @@
 Turonbank Exchange Rates Collector
 
 Collects exchange rates from Turonbank using HTML scraping.
-Uses requests library for reliable HTTP handling.
+Uses the shared async HTTP client and FETCH_SEMAPHORE from collectors._http.
 """
 
 import asyncio
 import logging
+import re
 from typing import List, Tuple
 
-import requests
-from bs4 import BeautifulSoup
+from collectors._base import make_soup, run_collector
+from collectors._http import FETCH_SEMAPHORE, get_http_client
 
-from core.repos import BankRatesRepo
-from infrastructure.db import SessionLocal
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-SUPPORTED_CURRENCIES = ["USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"]
+SUPPORTED_CURRENCIES = frozenset({"USD", "EUR", "RUB", "GBP", "JPY", "CHF", "KRW", "CNY"})
+
+# Fallback-path patterns: any supported code, and numbers like 12 650,5 once
+# _GROUP_SEP_RE has dropped the digit-group separators
+_CCY_RE = re.compile('|'.join(sorted(SUPPORTED_CURRENCIES)), re.IGNORECASE)
+_NUM_RE = re.compile(r'\d+[.,]?\d*')
+_GROUP_SEP_RE = re.compile(r'(?<=\d)[ \xa0\u202f](?=\d{3}(?!\d))')
+_TABLE_RE = re.compile(r'<table\b.*?</table>', re.DOTALL | re.IGNORECASE)
+_TABLE_OPEN_RE = re.compile(r'<table\b', re.IGNORECASE)
+
+# div/tr/li whose class mentions rate, currency or exchange (case-insensitive)
+_RATE_CONTAINER_SELECTOR = ':is(div, tr, li):is([class*="rate" i], [class*="currency" i], [class*="exchange" i])'
 
 TURONBANK_CONFIG = {
     "name": "Turonbank",
     "slug": "turonbank",
     "url": "https://turonbank.uz/en/services/exchange-rates/",
-    "website": "https://turonbank.uz"
+    "website": "https://turonbank.uz",
+    "region": "Commercial"
 }
 
 
-def fetch_html_sync() -> str:
-    """Fetch Turonbank HTML page."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-    }
-    
-    response = requests.get(TURONBANK_CONFIG["url"], headers=headers, timeout=20)
+_HEADERS_HTML = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+}
+
+
+async def fetch_html() -> str:
+    """Fetch Turonbank HTML page over the shared keep-alive client."""
+    async with FETCH_SEMAPHORE:
+        response = await get_http_client().get(TURONBANK_CONFIG["url"], headers=_HEADERS_HTML)
     response.raise_for_status()
     logger.info(f"✅ Fetched {len(response.text)} chars")
     return response.text
@@ -49,8 +57,7 @@ async def fetch_turonbank_rates() -> List[Tuple[str, float, float]]:
     logger.info(f"🏦 Fetching Turonbank rates from {TURONBANK_CONFIG['url']}")
     
     try:
-        loop = asyncio.get_event_loop()
-        html = await loop.run_in_executor(None, fetch_html_sync)
+        html = await fetch_html()
         
         rates = parse_turonbank_html(html)
         logger.info(f"✅ Parsed {len(rates)} rates from Turonbank")
@@ -66,16 +73,20 @@ def parse_turonbank_html(html: str) -> List[Tuple[str, float, float]]:
     rates = []
     
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        # Only tables whose raw markup mentions a supported code can hold
+        # rates; navigation/footer tables are dropped before BS4 sees them.
+        # The non-greedy cut stops at the first </table>, so a nested table
+        # would truncate its parent: parse the whole page in that case
+        tables_html = _TABLE_RE.findall(html)
+        if any(_TABLE_OPEN_RE.search(t, 1) for t in tables_html):
+            soup = make_soup(html)
+        else:
+            soup = make_soup(''.join(t for t in tables_html if _CCY_RE.search(t)))
         
         # Look for tables with exchange rates
         tables = soup.find_all('table')
         logger.info(f"🔍 Found {len(tables)} tables")
         
-        # Also look for divs that might contain rates
-        rate_containers = soup.find_all(['div', 'tr', 'li'], class_=lambda x: bool(x and ('rate' in x.lower() or 'currency' in x.lower() or 'exchange' in x.lower())))
-        logger.info(f"🔍 Found {len(rate_containers)} potential rate containers")
-        
         # Search in tables first
         for table in tables:
             rows = table.find_all('tr')
@@ -85,36 +96,34 @@ def parse_turonbank_html(html: str) -> List[Tuple[str, float, float]]:
                     if len(cols) < 2:
                         continue
                     
-                    # Look for currency code
+                    # Single pass over the cells: the first cell whose text is a
+                    # supported code names the row, and exchange-value spans
+                    # hold the numbers
                     code = None
-                    for col in cols:
-                        text = col.get_text(strip=True).upper()
-                        if text in SUPPORTED_CURRENCIES:
-                            code = text
-                            break
-                    
-                    if not code:
-                        continue
-                    
-                    # Extract numeric values from exchange-value spans
                     values = []
                     for col in cols:
+                        if code is None:
+                            text = col.get_text(strip=True).upper()
+                            if text in SUPPORTED_CURRENCIES:
+                                code = text
+                        
+                        exchange_div = col.find('div', class_='exchange-value')
+                        if not exchange_div:
+                            continue
+                        
+                        span = exchange_div.find('span')
+                        if not span:
+                            continue
+                        
                         try:
-                            # Look specifically for exchange-value divs containing span tags
-                            exchange_div = col.find('div', class_='exchange-value')
-                            if not exchange_div:
-                                continue
-                            
-                            span = exchange_div.find('span')
-                            if not span:
-                                continue
-                                
-                            text = span.get_text(strip=True).replace(' ', '').replace(',', '')
-                            val = float(text)
-                            if val > 0 and val < 1000000:  # Sanity check: rates should be under 1 million
-                                values.append(val)
-                        except (ValueError, AttributeError):
+                            val = float(span.get_text(strip=True).replace(' ', '').replace(',', ''))
+                        except ValueError:
                             continue
+                        if val > 0 and val < 1000000:  # Sanity check: rates should be under 1 million
+                            values.append(val)
+                    
+                    if not code:
+                        continue
                     
                     if len(values) >= 2:
                         rates.append((code, values[0], values[1]))
@@ -127,25 +136,28 @@ def parse_turonbank_html(html: str) -> List[Tuple[str, float, float]]:
                     logger.debug(f"Failed to parse row: {e}")
                     continue
         
-        # If no rates found in tables, try other containers
+        # If no rates found in tables, try other containers. Only searched on
+        # this path, with one compiled selector instead of a per-tag callback
         if not rates:
+            soup = make_soup(html)
+            rate_containers = soup.select(_RATE_CONTAINER_SELECTOR)
+            logger.info(f"🔍 Found {len(rate_containers)} potential rate containers")
             for container in rate_containers:
                 try:
-                    text = container.get_text(strip=True).upper()
-                    for currency in SUPPORTED_CURRENCIES:
-                        if currency in text:
-                            import re
-                            numbers = re.findall(r'\d+[\.,]?\d*', text)
-                            if numbers:
-                                values = [float(n.replace(',', '.')) for n in numbers if float(n.replace(',', '.')) > 0]
-                                if len(values) >= 2:
-                                    rates.append((currency, values[0], values[1]))
-                                    logger.debug(f"{currency}: buy={values[0]}, sell={values[1]}")
-                                    break
-                                elif len(values) == 1:
-                                    rates.append((currency, values[0], values[0]))
-                                    logger.debug(f"{currency}: {values[0]}")
-                                    break
+                    text = _GROUP_SEP_RE.sub('', container.get_text(strip=True))
+                    match = _CCY_RE.search(text)
+                    if not match:
+                        continue
+                    currency = match.group().upper()
+                    
+                    nums = [float(n.replace(',', '.')) for n in _NUM_RE.findall(text)]
+                    values = [v for v in nums if v > 0]
+                    if len(values) >= 2:
+                        rates.append((currency, values[0], values[1]))
+                        logger.debug("%s: buy=%s, sell=%s", currency, values[0], values[1])
+                    elif len(values) == 1:
+                        rates.append((currency, values[0], values[0]))
+                        logger.debug("%s: %s", currency, values[0])
                 except Exception as e:
                     continue
                     
@@ -155,63 +167,9 @@ def parse_turonbank_html(html: str) -> List[Tuple[str, float, float]]:
     return rates
 
 
-async def save_rates_to_db(rates: List[Tuple[str, float, float]]) -> None:
-    """Save rates to database."""
-    if not rates:
-        logger.warning("⚠️ No rates to save")
-        return
-    
-    async with SessionLocal() as session:
-        repo = BankRatesRepo(session)
-        
-        try:
-            bank = await repo.get_bank_by_slug(TURONBANK_CONFIG["slug"])
-            if not bank:
-                bank = await repo.create_bank(
-                    name=TURONBANK_CONFIG["name"],
-                    slug=TURONBANK_CONFIG["slug"],
-                    region="Commercial",
-                    website=TURONBANK_CONFIG["website"]
-                )
-                logger.info(f"✅ Created bank: {bank.name}")
-            
-            saved_count = 0
-            for currency_code, buy_rate, sell_rate in rates:
-                try:
-                    await repo.add_rate(
-                        bank_id=bank.id,  # type: ignore
-                        code=currency_code,
-                        buy=buy_rate,
-                        sell=sell_rate
-                    )
-                    saved_count += 1
-                except Exception as e:
-                    logger.error(f"❌ Failed to save {currency_code} rate: {e}")
-            
-            await session.commit()
-            logger.info(f"✅ Saved {saved_count}/{len(rates)} rates to database")
-            
-        except Exception as e:
-            logger.error(f"❌ Database error: {e}", exc_info=True)
-            await session.rollback()
-
-
 async def collect():
     """Main collection function."""
-    try:
-        logger.info("Starting Turonbank collection...")
-        rates = await fetch_turonbank_rates()
-        
-        if rates:
-            await save_rates_to_db(rates)
-            return len(rates)
-        else:
-            logger.warning("No rates collected")
-            return 0
-            
-    except Exception as e:
-        logger.error(f"❌ Collection failed: {e}")
-        return 0
+    return await run_collector(TURONBANK_CONFIG, fetch_turonbank_rates)
 
 
 if __name__ == "__main__":
@@ -8,6 +8,8 @@ class User(Base):
     """User model for storing Telegram user information."""
     
     __tablename__ = "users"
+    # Fetch server defaults via INSERT ... RETURNING, so no refresh() is needed
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     tg_user_id = Column(BigInteger, unique=True, nullable=False, index=True)
@@ -42,6 +44,7 @@ class BankRate(Base):
     """Bank rate model for storing currency exchange rates."""
     
     __tablename__ = "bank_rates"
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     bank_id = Column(Integer, ForeignKey("banks.id"), nullable=False, index=True)
@@ -79,6 +82,7 @@ class Dashboard(Base):
     """Dashboard model for tracking live currency rate messages."""
     
     __tablename__ = "dashboards"
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(BigInteger, nullable=False, index=True)  # Telegram user ID
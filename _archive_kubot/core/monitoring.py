@@ -4,7 +4,7 @@ Monitoring and alerting utilities for collectors.
 import logging
 import time
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Set
 import os
 import sentry_sdk
 
@@ -20,25 +20,37 @@ class CollectorMonitor:
         self.collector_name = collector_name
         self.start_time: Optional[float] = None
         self.metrics: Dict[str, Any] = {}
+        # Plain counters on the hot path; copied into metrics by finish()
+        self.success = 0
+        self.failures = 0
+        # During a failure storm only the first traceback is formatted and
+        # each exception type is reported to Sentry once
+        self._first_error_logged = False
+        self._reported_error_types: Set[type] = set()
     
     def start(self):
         """Start monitoring session."""
-        self.start_time = time.time()
+        self.start_time = time.monotonic()
         logger.info(f"🚀 Starting {self.collector_name} collector")
     
     def record_success(self, count: int = 1):
         """Record successful operations."""
-        self.metrics['success'] = self.metrics.get('success', 0) + count
+        self.success += count
     
     def record_failure(self, count: int = 1, error: Optional[Exception] = None):
         """Record failed operations."""
-        self.metrics['failures'] = self.metrics.get('failures', 0) + count
+        self.failures += count
         
         if error:
-            logger.error(f"❌ {self.collector_name} error: {error}", exc_info=True)
+            if not self._first_error_logged:
+                logger.error("❌ %s error: %s", self.collector_name, error, exc_info=error)
+                self._first_error_logged = True
+            else:
+                logger.error("❌ %s error (failure #%d): %s", self.collector_name, self.failures, error)
             
             # Send to Sentry if configured
-            if SENTRY_DSN:
+            if SENTRY_DSN and type(error) not in self._reported_error_types:
+                self._reported_error_types.add(type(error))
                 sentry_sdk.capture_exception(error)
     
     def record_metric(self, key: str, value: Any):
@@ -55,24 +67,26 @@ class CollectorMonitor:
         Returns:
             Dictionary of metrics
         """
-        if self.start_time:
-            duration = time.time() - self.start_time
+        if self.start_time is not None:
+            duration = time.monotonic() - self.start_time
             self.metrics['duration_seconds'] = round(duration, 2)
         
         self.metrics['timestamp'] = datetime.now(timezone.utc).isoformat()
         self.metrics['collector'] = self.collector_name
+        self.metrics['success'] = self.success
+        self.metrics['failures'] = self.failures
         
         # Calculate success rate
-        total = self.metrics.get('success', 0) + self.metrics.get('failures', 0)
+        total = self.success + self.failures
         if total > 0:
-            success_rate = (self.metrics.get('success', 0) / total) * 100
+            success_rate = (self.success / total) * 100
             self.metrics['success_rate'] = round(success_rate, 2)
         
         # Log summary
         logger.info(
             f"✅ {self.collector_name} completed: "
-            f"Success: {self.metrics.get('success', 0)}, "
-            f"Failures: {self.metrics.get('failures', 0)}, "
+            f"Success: {self.success}, "
+            f"Failures: {self.failures}, "
             f"Duration: {self.metrics.get('duration_seconds', 0)}s"
         )
         
@@ -84,8 +98,8 @@ class CollectorMonitor:
     
     def should_alert(self) -> bool:
         """Determine if we should send an alert based on metrics."""
-        failures = self.metrics.get('failures', 0)
-        success = self.metrics.get('success', 0)
+        failures = self.failures
+        success = self.success
         total = failures + success
         
         # Alert if:
@@ -2,11 +2,140 @@
 Rates service for generating daily digest content.
 """
 import asyncio
+import logging
+import os
+import time
+from functools import lru_cache
+from statistics import fmean
 from datetime import datetime, date
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.repos import BankRatesRepo
 from core.models import BankRate
+from core.validation import get_validated_twa_url
+from infrastructure.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Bank rates change at most once per collector cycle, so the digest bundle is
+# shared across requests/broadcast renders: fresh for BUNDLE_TTL seconds, then
+# served stale for up to BUNDLE_SWR_TTL more while one background task reloads it
+BUNDLE_TTL = 60
+BUNDLE_SWR_TTL = 300
+_BUNDLE_CODES = ['USD', 'EUR', 'RUB']
+_bundle_cache: Optional[Tuple[float, Dict[str, List[BankRate]]]] = None
+_bundle_refresh: Optional[asyncio.Task] = None
+
+
+def _copy_bundle(bundle: Dict[str, List[BankRate]]) -> Dict[str, List[BankRate]]:
+    """Copy the dict and its per-currency lists so callers can't mutate the cache."""
+    return {code: list(rates) for code, rates in bundle.items()}
+
+
+async def _load_bundle(repo: BankRatesRepo) -> Dict[str, List[BankRate]]:
+    """Load the bundle and store it in the cache."""
+    global _bundle_cache
+    # One query for all currencies, top 5 rates each for the digest
+    bundle = await repo.latest_by_codes(_BUNDLE_CODES, top_n=5)
+    _bundle_cache = (time.monotonic(), bundle)
+    return bundle
+
+
+async def _revalidate_bundle() -> None:
+    """Reload the bundle on its own session; the caller's may be in use."""
+    try:
+        async with SessionLocal() as session:
+            await _load_bundle(BankRatesRepo(session))
+    except Exception as e:
+        logger.warning("⚠️ Background bundle refresh failed: %s", e)
+
+
+# Digest text fragments, formatted once per render instead of rebuilt per call
+_DIGEST_HEADERS = {
+    'en': "💰 Daily Rates - {today}",
+    'ru': "💰 Дневные курсы - {today}",
+    'uz_cy': "💰 Кунлик курслар - {today}"
+}
+
+_CURRENCY_LABELS = {
+    'USD': '🇺🇸 USD:',
+    'EUR': '🇪🇺 EUR:',
+    'RUB': '🇷🇺 RUB:'
+}
+
+_STAT_TEMPLATES = {
+    'en': "  💎 Best: {best}\n  📊 Avg: {avg}",
+    'ru': "  💎 Лучший: {best}\n  📊 Средний: {avg}",
+    'uz_cy': "  💎 Энг яхши: {best}\n  📊 Ўртача: {avg}"
+}
+
+_DIGEST_FOOTERS = {
+    'en': "🕘 Updated this morning",
+    'ru': "🕘 Обновлено утром",
+    'uz_cy': "🕘 Эрталаб янгиланди"
+}
+
+
+@lru_cache(maxsize=32)
+def _render_digest(bundle_key: Tuple[Tuple[str, Tuple[float, ...]], ...], lang: str, today: str) -> str:
+    """Render the digest text for (currency, sell rates) pairs; see format_digest_message."""
+    header = _DIGEST_HEADERS.get(lang, _DIGEST_HEADERS['en'])
+    stat_template = _STAT_TEMPLATES.get(lang)
+    
+    message_parts = [header.format(today=today), '']
+    
+    for currency, sell_rates in bundle_key:
+        if not sell_rates:
+            continue
+        
+        message_parts.append(_CURRENCY_LABELS[currency])
+        
+        # Get best and average rates (sell rates are already floats)
+        if stat_template is not None:
+            message_parts.append(stat_template.format(
+                best=format(min(sell_rates), ',.0f'),
+                avg=format(fmean(sell_rates), ',.0f'),
+            ))
+        
+        message_parts.append('')  # Empty line
+    
+    message_parts.append(_DIGEST_FOOTERS.get(lang, _DIGEST_FOOTERS['en']))
+    
+    return '\n'.join(message_parts)
+
+
+_DIGEST_BUTTON_TEXTS = {
+    'en': {'refresh': '🔄 Refresh', 'live': '🟢 Live Rates'},
+    'ru': {'refresh': '🔄 Обновить', 'live': '🟢 Живой курс'},
+    'uz_cy': {'refresh': '🔄 Янгилаш', 'live': '🟢 Жонли курс'}
+}
+
+# Built on first use rather than at import: TWA_BASE_URL is only set once
+# the bot entrypoint has loaded its .env
+_keyboard_cache: Dict[Tuple[str, str], InlineKeyboardMarkup] = {}
+
+
+def _build_digest_keyboard(lang: str, user_lang: str) -> InlineKeyboardMarkup:
+    # Get validated TWA base URL
+    twa_base_url = get_validated_twa_url(os.getenv("TWA_BASE_URL", ""))
+    
+    texts = _DIGEST_BUTTON_TEXTS.get(lang, _DIGEST_BUTTON_TEXTS['en'])
+    
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text=texts['refresh'],
+                    callback_data="refresh_rates"
+                ),
+                InlineKeyboardButton(
+                    text=texts['live'],
+                    web_app=WebAppInfo(url=f"{twa_base_url}/twa?lang={user_lang}")
+                )
+            ]
+        ]
+    )
 
 
 class RatesService:
@@ -17,111 +146,40 @@ class RatesService:
         self.rates_repo = BankRatesRepo(session)
     
     async def get_daily_bundle(self) -> Dict[str, List[BankRate]]:
-        """Get daily rates bundle for USD, EUR, RUB."""
-        currencies = ['USD', 'EUR', 'RUB']
-        bundle = {}
-        
-        for currency in currencies:
-            rates = await self.rates_repo.latest_by_code(currency)
-            if rates:
-                # Get top 5 rates for digest
-                bundle[currency] = rates[:5]
-            else:
-                bundle[currency] = []
+        """Get daily rates bundle for USD, EUR, RUB (stale-while-revalidate cached)."""
+        global _bundle_refresh
+        if _bundle_cache is not None:
+            fetched_at, bundle = _bundle_cache
+            age = time.monotonic() - fetched_at
+            if age < BUNDLE_TTL:
+                return _copy_bundle(bundle)
+            if age < BUNDLE_TTL + BUNDLE_SWR_TTL:
+                if _bundle_refresh is None or _bundle_refresh.done():
+                    _bundle_refresh = asyncio.create_task(_revalidate_bundle())
+                return _copy_bundle(bundle)
         
-        return bundle
+        return _copy_bundle(await _load_bundle(self.rates_repo))
     
     def format_digest_message(self, bundle: Dict[str, List[BankRate]], lang: str = 'en') -> str:
         """Format daily digest message in specified language."""
+        # Rendering is pure in (sell rates, lang, date); broadcasts reuse the text
+        bundle_key = tuple(
+            (currency, tuple(float(rate.sell) for rate in rates))
+            for currency, rates in bundle.items()
+        )
         today = datetime.now().strftime('%d.%m.%Y')
-        
-        # Language-specific headers
-        headers = {
-            'en': f"💰 Daily Rates - {today}",
-            'ru': f"💰 Дневные курсы - {today}",
-            'uz_cy': f"💰 Кунлик курслар - {today}"
-        }
-        
-        # Currency symbols
-        symbols = {
-            'USD': '🇺🇸 USD',
-            'EUR': '🇪🇺 EUR', 
-            'RUB': '🇷🇺 RUB'
-        }
-        
-        message_parts = [headers.get(lang, headers['en'])]
-        message_parts.append('')  # Empty line
-        
-        for currency, rates in bundle.items():
-            if not rates:
-                continue
-                
-            message_parts.append(f"{symbols[currency]}:")
-            
-            # Get best and average rates
-            sell_rates = [float(getattr(rate, 'sell')) for rate in rates]
-            best_rate = min(sell_rates)
-            avg_rate = sum(sell_rates) / len(sell_rates)
-            
-            if lang == 'en':
-                message_parts.append(f"  💎 Best: {best_rate:,.0f}")
-                message_parts.append(f"  📊 Avg: {avg_rate:,.0f}")
-            elif lang == 'ru':
-                message_parts.append(f"  💎 Лучший: {best_rate:,.0f}")
-                message_parts.append(f"  📊 Средний: {avg_rate:,.0f}")
-            elif lang == 'uz_cy':
-                message_parts.append(f"  💎 Энг яхши: {best_rate:,.0f}")
-                message_parts.append(f"  📊 Ўртача: {avg_rate:,.0f}")
-            
-            message_parts.append('')  # Empty line
-        
-        # Add footer
-        footer_texts = {
-            'en': "🕘 Updated this morning",
-            'ru': "🕘 Обновлено утром", 
-            'uz_cy': "🕘 Эрталаб янгиланди"
-        }
-        
-        message_parts.append(footer_texts.get(lang, footer_texts['en']))
-        
-        return '\n'.join(message_parts)
+        return _render_digest(bundle_key, lang, today)
     
-    def get_digest_keyboard(self, lang: str = 'en', user_lang: str | None = None):
+    def get_digest_keyboard(self, lang: str = 'en', user_lang: str | None = None) -> InlineKeyboardMarkup:
         """Get inline keyboard for digest message."""
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
-        import os
-        from core.validation import get_validated_twa_url
-        
         if user_lang is None:
             user_lang = lang
-            
-        # Get validated TWA base URL
-        twa_base_url = get_validated_twa_url(os.getenv("TWA_BASE_URL", ""))
-        
-        # Button texts
-        button_texts = {
-            'en': {'refresh': '🔄 Refresh', 'live': '🟢 Live Rates'},
-            'ru': {'refresh': '🔄 Обновить', 'live': '🟢 Живой курс'},
-            'uz_cy': {'refresh': '🔄 Янгилаш', 'live': '🟢 Жонли курс'}
-        }
-        
-        texts = button_texts.get(lang, button_texts['en'])
-        
-        keyboard = InlineKeyboardMarkup(
-            inline_keyboard=[
-                [
-                    InlineKeyboardButton(
-                        text=texts['refresh'],
-                        callback_data="refresh_rates"
-                    ),
-                    InlineKeyboardButton(
-                        text=texts['live'],
-                        web_app=WebAppInfo(url=f"{twa_base_url}/twa?lang={user_lang}")
-                    )
-                ]
-            ]
-        )
         
+        # Markups are immutable per (lang, user_lang); broadcasts reuse them
+        key = (lang, user_lang)
+        keyboard = _keyboard_cache.get(key)
+        if keyboard is None:
+            keyboard = _keyboard_cache[key] = _build_digest_keyboard(lang, user_lang)
         return keyboard
 
 
@@ -1,7 +1,7 @@
-from typing import Optional, List, Dict
-from sqlalchemy import select, update, desc, and_, insert, func
+from typing import Optional, List, Dict, Iterable, Tuple, AsyncIterator
+from sqlalchemy import select, update, desc, and_, insert, func, text, lambda_stmt
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, raiseload
 from sqlalchemy.dialects.postgresql import insert as postgres_insert
 from datetime import datetime, date, timezone
 from core.models import User, Bank, BankRate, CbuRate, Dashboard
@@ -16,8 +16,9 @@ class UserRepository:
     
     async def get_by_tg_user_id(self, tg_user_id: int) -> Optional[User]:
         """Get user by Telegram user ID."""
+        # lambda_stmt caches the compiled SQL; tg_user_id becomes a bound parameter
         result = await self.session.execute(
-            select(User).where(User.tg_user_id == tg_user_id)
+            lambda_stmt(lambda: select(User).where(User.tg_user_id == tg_user_id))
         )
         return result.scalars().first()
     
@@ -26,7 +27,6 @@ class UserRepository:
         user = User(tg_user_id=tg_user_id, lang=lang, tz=tz)
         self.session.add(user)
         await self.session.commit()
-        await self.session.refresh(user)
         return user
     
     async def update_language(self, tg_user_id: int, lang: str) -> Optional[User]:
@@ -45,23 +45,36 @@ class UserRepository:
     async def get_or_create_user(self, tg_user_id: int, default_lang: str = "uz_cy") -> User:
         """Get existing user or create new one."""
         user = await self.get_by_tg_user_id(tg_user_id)
-        if not user:
-            user = await self.create_user(tg_user_id, default_lang)
+        if user:
+            return user
+        
+        # Insert-or-skip is race-free; RETURNING yields no row if a concurrent
+        # update created the user first
+        stmt = (
+            postgres_insert(User)
+            .values(tg_user_id=tg_user_id, lang=default_lang)
+            .on_conflict_do_nothing(index_elements=['tg_user_id'])
+            .returning(User)
+        )
+        result = await self.session.execute(stmt)
+        user = result.scalars().first()
+        if user is None:
+            return await self.get_by_tg_user_id(tg_user_id)  # type: ignore
+        await self.session.commit()
         return user
     
     async def toggle_subscription(self, tg_user_id: int) -> Optional[User]:
         """Toggle user's subscription status."""
-        user = await self.get_by_tg_user_id(tg_user_id)
+        # Flip the flag in SQL so no SELECT is needed before or after
+        result = await self.session.execute(
+            update(User)
+            .where(User.tg_user_id == tg_user_id)
+            .values(subscribed=~User.subscribed)
+            .returning(User)
+        )
+        user = result.scalars().first()
         if user:
-            # Use update statement instead of direct attribute assignment
-            new_subscribed = not bool(user.subscribed)
-            await self.session.execute(
-                update(User)
-                .where(User.tg_user_id == tg_user_id)
-                .values(subscribed=new_subscribed)
-            )
             await self.session.commit()
-            await self.session.refresh(user)
         return user
     
     async def get_subscribed_users(self) -> List[User]:
@@ -71,6 +84,30 @@ class UserRepository:
         )
         return list(result.scalars().all())
     
+    async def iter_subscribed_users(self, chunk: int = 1000) -> AsyncIterator[List[Tuple[int, str]]]:
+        """Yield subscribed users as lists of (tg_user_id, lang), chunk rows at a time.
+        
+        Uses keyset pagination on tg_user_id, so memory stays bounded and
+        users unsubscribed mid-iteration do not shift later pages.
+        """
+        last_id = 0
+        while True:
+            result = await self.session.execute(
+                select(User.tg_user_id, User.lang)
+                .where(User.subscribed == True, User.tg_user_id > last_id)
+                .order_by(User.tg_user_id)
+                .limit(chunk)
+            )
+            rows = [tuple(row) for row in result.all()]
+            # Don't leave the transaction open while the caller works on a chunk
+            await self.session.commit()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk:
+                return
+            last_id = rows[-1][0]
+    
     async def update_subscription(self, tg_user_id: int, subscribed: bool) -> Optional[User]:
         """Update user's subscription status."""
         result = await self.session.execute(
@@ -84,22 +121,6 @@ class UserRepository:
             await self.session.commit()
         return user
     
-    async def get_subscribers_grouped_by_lang(self) -> Dict[str, List[int]]:
-        """Get subscribed users grouped by language."""
-        result = await self.session.execute(
-            select(User.lang, User.tg_user_id)
-            .where(User.subscribed == True)
-            .order_by(User.lang, User.tg_user_id)
-        )
-        
-        groups = {}
-        for lang, tg_user_id in result.all():
-            if lang not in groups:
-                groups[lang] = []
-            groups[lang].append(tg_user_id)
-        
-        return groups
-    
     async def soft_unsubscribe(self, tg_user_id: int) -> Optional[User]:
         """Soft unsubscribe user (blocked/unauthorized)."""
         return await self.update_subscription(tg_user_id, False)
@@ -113,37 +134,66 @@ class BankRatesRepo:
     
     async def latest_by_code(self, code: str) -> List[BankRate]:
         """Get latest rates per bank for given currency code, sorted by sell rate DESC."""
-        from sqlalchemy import func
-        
-        # Subquery to get latest fetched_at per bank for the currency
+        # DISTINCT ON keeps the newest row per bank in a single scan
         latest_subq = (
-            select(
-                BankRate.bank_id,
-                func.max(BankRate.fetched_at).label('max_fetched')
-            )
+            select(BankRate.id)
             .where(BankRate.code == code.upper())
-            .group_by(BankRate.bank_id)
+            .order_by(BankRate.bank_id, desc(BankRate.fetched_at))
+            .distinct(BankRate.bank_id)
             .subquery()
         )
         
-        # Main query to get the actual latest rates
+        # Everything except rate.bank is raiseload'ed, so an accidental lazy
+        # load (an N+1 in async code) fails loudly instead of querying per row
         result = await self.session.execute(
             select(BankRate)
-            .join(latest_subq, and_(
-                BankRate.bank_id == latest_subq.c.bank_id,
-                BankRate.fetched_at == latest_subq.c.max_fetched
-            ))
-            .where(BankRate.code == code.upper())
-            .options(selectinload(BankRate.bank))
+            .join(latest_subq, BankRate.id == latest_subq.c.id)
+            .options(selectinload(BankRate.bank).raiseload('*'), raiseload('*'))
             .order_by(desc(BankRate.sell))
         )
         
         return list(result.scalars().all())
     
+    async def latest_by_codes(self, codes: List[str], top_n: Optional[int] = None) -> Dict[str, List[BankRate]]:
+        """Get latest rates per bank for several currency codes in one query.
+        
+        Returns {code: rates} with each list sorted by sell rate DESC, as
+        latest_by_code does, truncated to top_n when given.
+        """
+        codes = [code.upper() for code in codes]
+        
+        # Rank each bank's rows per currency by recency; rn == 1 is the latest
+        ranked = (
+            select(
+                BankRate.id,
+                func.row_number().over(
+                    partition_by=(BankRate.bank_id, BankRate.code),
+                    order_by=desc(BankRate.fetched_at),
+                ).label('rn')
+            )
+            .where(BankRate.code.in_(codes))
+            .subquery()
+        )
+        
+        result = await self.session.execute(
+            select(BankRate)
+            .join(ranked, BankRate.id == ranked.c.id)
+            .where(ranked.c.rn == 1)
+            .options(selectinload(BankRate.bank).raiseload('*'), raiseload('*'))
+            .order_by(BankRate.code, desc(BankRate.sell))
+        )
+        
+        grouped: Dict[str, List[BankRate]] = {code: [] for code in codes}
+        for rate in result.scalars().all():
+            rates = grouped[rate.code]
+            if top_n is None or len(rates) < top_n:
+                rates.append(rate)
+        return grouped
+    
     async def get_bank_by_slug(self, slug: str) -> Optional[Bank]:
         """Get bank by slug."""
         result = await self.session.execute(
-            select(Bank).where(Bank.slug == slug)
+            lambda_stmt(lambda: select(Bank).where(Bank.slug == slug))
         )
         return result.scalars().first()
     
@@ -152,7 +202,6 @@ class BankRatesRepo:
         bank = Bank(name=name, slug=slug, region=region, website=website)
         self.session.add(bank)
         await self.session.commit()
-        await self.session.refresh(bank)
         return bank
     
     async def add_rate(self, bank_id: int, code: str, buy: float, sell: float) -> BankRate:
@@ -160,8 +209,74 @@ class BankRatesRepo:
         rate = BankRate(bank_id=bank_id, code=code.upper(), buy=buy, sell=sell)
         self.session.add(rate)
         await self.session.commit()
-        await self.session.refresh(rate)
         return rate
+    
+    async def add_rates(self, bank_id: int, rates: Iterable[Tuple[str, float, float]]) -> int:
+        """Add several exchange rates for one bank in one batched INSERT.
+        
+        Rows go through executemany, which SQLAlchemy turns into paged
+        multi-row INSERTs (insertmanyvalues_page_size on the engine).
+        
+        rates may be any iterable of (code, buy, sell) rows, e.g. a parser's
+        list of tuples or zip(codes, buys, sells) over columnar arrays.
+        Unlike add_rate this does not commit; the caller owns the transaction.
+        """
+        values = [
+            {"bank_id": bank_id, "code": code.upper(), "buy": buy, "sell": sell}
+            for code, buy, sell in rates
+        ]
+        if not values:
+            return 0
+        await self.session.execute(insert(BankRate), values)
+        return len(values)
+
+
+
+# Bank rows are long-lived config records, so slug -> id is cached per process
+_bank_id_cache: Dict[str, int] = {}
+
+
+async def get_or_create_bank_id(
+    repo: BankRatesRepo,
+    slug: str,
+    name: str,
+    region: str | None = None,
+    website: str | None = None,
+) -> int:
+    """Return the bank id for slug, creating the bank on first use.
+    
+    Only the first call per slug hits the database.
+    """
+    bank_id = _bank_id_cache.get(slug)
+    if bank_id is not None:
+        return bank_id
+    
+    bank = await repo.get_bank_by_slug(slug)
+    if not bank:
+        bank = await repo.create_bank(name=name, slug=slug, region=region, website=website)
+    _bank_id_cache[slug] = bank.id  # type: ignore
+    return bank.id  # type: ignore
+
+def _parse_rate_date(value: date | str | None, today: date | None = None) -> date:
+    """Return the rate date for a date, ISO date/datetime string or None.
+    
+    Unparseable strings and None fall back to today (pass it in to reuse
+    one value across a batch).
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value:
+        try:
+            return date.fromisoformat(value[:10])  # Handle datetime strings
+        except ValueError:
+            pass
+    return today or date.today()
+
+
+# Batches at least this large go through COPY instead of a multi-row INSERT
+CBU_COPY_THRESHOLD = 100
 
 
 class CbuRatesRepo:
@@ -170,21 +285,14 @@ class CbuRatesRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
     
-    async def upsert_rate(self, code: str, rate: float, date_str: str | None = None, fetched_at: datetime | None = None):
+    async def upsert_rate(self, code: str, rate: float, date_str: date | str | None = None, fetched_at: datetime | None = None):
         """Insert or update CBU rate with conflict resolution."""
         await self._upsert_in_session(self.session, code, rate, date_str, fetched_at)
     
-    async def _upsert_in_session(self, session: AsyncSession, code: str, rate: float, date_str: str | None, fetched_at: datetime | None):
+    async def _upsert_in_session(self, session: AsyncSession, code: str, rate: float, date_str: date | str | None, fetched_at: datetime | None):
         """Perform upsert operation within a session."""
         try:
-            # Parse date or use today
-            if date_str:
-                try:
-                    rate_date = date.fromisoformat(date_str.split('T')[0])  # Handle datetime strings
-                except (ValueError, AttributeError):
-                    rate_date = date.today()
-            else:
-                rate_date = date.today()
+            rate_date = _parse_rate_date(date_str)
             
             # Use current time if fetched_at not provided
             if fetched_at is None:
@@ -214,6 +322,105 @@ class CbuRatesRepo:
             await session.rollback()
             raise e
     
+    async def bulk_upsert_rates(
+        self,
+        rates: Iterable[Tuple[str, float, date | str | None, datetime | None]],
+        commit: bool = True,
+    ) -> int:
+        """Insert or update several CBU rates in one multi-row upsert.
+        
+        rates is an iterable of (code, rate, date_str, fetched_at) rows with
+        the same meaning as upsert_rate's arguments. Commits once, or not at
+        all with commit=False so the caller can add more writes to the
+        same transaction.
+        """
+        now = datetime.now(timezone.utc)
+        today = date.today()
+        # A batch usually shares one date string, so each distinct one is parsed once
+        rate_dates: Dict[date | str | None, date] = {}
+        # ON CONFLICT DO UPDATE cannot touch the same row twice in one
+        # statement, so duplicates of (code, rate_date) collapse to the last
+        values: Dict[Tuple[str, date], Dict] = {}
+        for code, rate, date_str, fetched_at in rates:
+            code = code.upper()
+            rate_date = rate_dates.get(date_str)
+            if rate_date is None:
+                rate_date = rate_dates[date_str] = _parse_rate_date(date_str, today)
+            values[(code, rate_date)] = {
+                "code": code,
+                "rate": rate,
+                "rate_date": rate_date,
+                "fetched_at": fetched_at or now,
+            }
+        if not values:
+            return 0
+        
+        if len(values) >= CBU_COPY_THRESHOLD:
+            await self.bulk_copy_rates(
+                [(v["code"], v["rate"], v["rate_date"], v["fetched_at"]) for v in values.values()],
+                commit=commit,
+            )
+            return len(values)
+        
+        try:
+            stmt = postgres_insert(CbuRate).values(list(values.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['code', 'rate_date'],
+                set_=dict(
+                    rate=stmt.excluded.rate,
+                    fetched_at=stmt.excluded.fetched_at
+                )
+            )
+            await self.session.execute(stmt)
+            if commit:
+                await self.session.commit()
+        except Exception as e:
+            if commit:
+                await self.session.rollback()
+            raise e
+        return len(values)
+    
+    async def bulk_copy_rates(
+        self,
+        records: Iterable[Tuple[str, float, date, datetime]],
+        commit: bool = True,
+    ) -> None:
+        """Upsert a large batch of CBU rates via COPY (for backfills).
+        
+        records are (code, rate, rate_date, fetched_at) rows with unique
+        (code, rate_date) keys. They are COPYed into a temporary table and
+        merged into cbu_rates with one INSERT ... ON CONFLICT. Commits once
+        unless commit=False.
+        """
+        try:
+            await self.session.execute(text(
+                "CREATE TEMP TABLE cbu_rates_copy "
+                "(code varchar(3), rate numeric(12, 4), rate_date date, fetched_at timestamptz) "
+                "ON COMMIT DROP"
+            ))
+            # COPY is only exposed by asyncpg itself, on the session's connection
+            conn = await self.session.connection()
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                'cbu_rates_copy',
+                records=list(records),
+                columns=['code', 'rate', 'rate_date', 'fetched_at'],
+            )
+            await self.session.execute(text(
+                "INSERT INTO cbu_rates (code, rate, rate_date, fetched_at) "
+                "SELECT code, rate, rate_date, fetched_at FROM cbu_rates_copy "
+                "ON CONFLICT (code, rate_date) DO UPDATE "
+                "SET rate = EXCLUDED.rate, fetched_at = EXCLUDED.fetched_at"
+            ))
+            # Dropped explicitly too, in case the transaction stays open
+            await self.session.execute(text("DROP TABLE cbu_rates_copy"))
+            if commit:
+                await self.session.commit()
+        except Exception as e:
+            if commit:
+                await self.session.rollback()
+            raise e
+    
     async def get_latest_rates(self, codes: List[str] | None = None) -> List[CbuRate]:
         """Get latest CBU rates for specified currency codes."""
         return await self._get_latest_in_session(self.session, codes)
@@ -234,11 +441,14 @@ class CbuRatesRepo:
     
     async def _get_latest_by_code_in_session(self, session: AsyncSession, code: str) -> Optional[CbuRate]:
         """Get latest rate for a specific currency code within a session."""
+        code = code.upper()
         result = await session.execute(
-            select(CbuRate)
-            .where(CbuRate.code == code.upper())
-            .order_by(desc(CbuRate.rate_date), desc(CbuRate.fetched_at))
-            .limit(1)
+            lambda_stmt(
+                lambda: select(CbuRate)
+                .where(CbuRate.code == code)
+                .order_by(desc(CbuRate.rate_date), desc(CbuRate.fetched_at))
+                .limit(1)
+            )
         )
         return result.scalars().first()
     
@@ -274,23 +484,22 @@ class DashboardsRepo:
         )
         self.session.add(dashboard)
         await self.session.commit()
-        await self.session.refresh(dashboard)
         return dashboard
     
     async def get_by_id(self, dashboard_id: int) -> Optional[Dashboard]:
         """Get dashboard by ID."""
         result = await self.session.execute(
-            select(Dashboard).where(Dashboard.id == dashboard_id)
+            lambda_stmt(lambda: select(Dashboard).where(Dashboard.id == dashboard_id))
         )
         return result.scalars().first()
     
     async def get_active_for_user(self, user_id: int, chat_id: Optional[int] = None) -> List[Dashboard]:
         """Get active dashboards for a user, optionally filtered by chat."""
-        query = select(Dashboard).where(
+        query = lambda_stmt(lambda: select(Dashboard).where(
             and_(Dashboard.user_id == user_id, Dashboard.is_active == True)
-        )
+        ))
         if chat_id:
-            query = query.where(Dashboard.chat_id == chat_id)
+            query += lambda s: s.where(Dashboard.chat_id == chat_id)
         
         result = await self.session.execute(query)
         return list(result.scalars().all())
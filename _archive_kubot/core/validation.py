@@ -1,8 +1,33 @@
 """Validation utilities for the application."""
 import re
-from typing import Optional
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Optional, Tuple
 from urllib.parse import urlparse
 
+# Characters that signal common XSS payloads in a URL
+_XSS_RE = re.compile(r'[<>"\']')
+_DEFAULT_SCHEMES = frozenset(['http', 'https'])
+# Host part of an http(s) URL, without port, path, query or fragment
+_NETLOC_RE = re.compile(r'^https?://([^/:?#]+)', re.I)
+
+# Whitelist of allowed domains for production
+TWA_DOMAIN_WHITELIST = (
+    'localhost',
+    '127.0.0.1',
+    'kubot.uz',
+    'www.kubot.uz',
+    'devtunnels.ms',  # VS Code Dev Tunnels
+)
+
+
+def _compile_whitelist(whitelist: Iterable[str]) -> Tuple[FrozenSet[str], Tuple[str, ...]]:
+    """Split a domain whitelist into exact names and '.domain' suffixes."""
+    domains = [allowed.lower() for allowed in whitelist]
+    return frozenset(domains), tuple(f'.{allowed}' for allowed in domains)
+
+
+_TWA_EXACT, _TWA_SUFFIXES = _compile_whitelist(TWA_DOMAIN_WHITELIST)
+
 
 def validate_url(url: str, allowed_schemes: Optional[list] = None) -> bool:
     """
@@ -15,16 +40,15 @@ def validate_url(url: str, allowed_schemes: Optional[list] = None) -> bool:
     Returns:
         True if valid, False otherwise
     """
-    if allowed_schemes is None:
-        allowed_schemes = ['http', 'https']
+    schemes = _DEFAULT_SCHEMES if allowed_schemes is None else allowed_schemes
     
     try:
         result = urlparse(url)
         return all([
-            result.scheme in allowed_schemes,
+            result.scheme in schemes,
             result.netloc,
             # Prevent common XSS patterns
-            not any(char in url for char in ['<', '>', '"', "'"]),
+            _XSS_RE.search(url) is None,
         ])
     except Exception:
         return False
@@ -41,27 +65,31 @@ def validate_twa_url(url: str, whitelist: Optional[list] = None) -> bool:
     Returns:
         True if valid, False otherwise
     """
+    if whitelist:
+        return _validate_twa_url(url, *_compile_whitelist(whitelist))
+    return _validate_twa_url(url, None, ())
+
+
+@lru_cache(maxsize=256)
+def _validate_twa_url(url: str, exact: Optional[FrozenSet[str]], suffixes: Tuple[str, ...]) -> bool:
+    """Cached body of validate_twa_url, taking a whitelist from _compile_whitelist."""
     if not validate_url(url):
         return False
     
     # If whitelist provided, check domain
-    if whitelist:
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
-        
-        # Remove port if present
-        if ':' in domain:
-            domain = domain.split(':')[0]
+    if exact:
+        match = _NETLOC_RE.match(url)
+        if match is None:
+            return False
+        domain = match.group(1).lower()
         
-        # Check if domain matches whitelist
-        return any(
-            domain == allowed or domain.endswith(f'.{allowed}')
-            for allowed in whitelist
-        )
+        # Exact domain or any subdomain of a whitelisted one
+        return domain in exact or domain.endswith(suffixes)
     
     return True
 
 
+@lru_cache(maxsize=32)
 def get_validated_twa_url(base_url: str, default: str = "http://localhost:3000") -> str:
     """
     Get validated TWA base URL with fallback.
@@ -73,16 +101,7 @@ def get_validated_twa_url(base_url: str, default: str = "http://localhost:3000")
     Returns:
         Validated URL or default
     """
-    # Whitelist of allowed domains for production
-    whitelist = [
-        'localhost',
-        '127.0.0.1',
-        'kubot.uz',
-        'www.kubot.uz',
-        'devtunnels.ms',  # VS Code Dev Tunnels
-    ]
-    
-    if base_url and validate_twa_url(base_url, whitelist):
+    if base_url and _validate_twa_url(base_url, _TWA_EXACT, _TWA_SUFFIXES):
         return base_url
     
     return default
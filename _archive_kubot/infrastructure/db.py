@@ -1,6 +1,8 @@
+import asyncio
 import os
 from typing import AsyncGenerator
 from contextlib import asynccontextmanager
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 
@@ -17,6 +19,16 @@ engine = create_async_engine(
     pool_pre_ping=True,  # Verify connections before using
     pool_size=20,  # Adjust based on load
     max_overflow=10,  # Additional connections if pool exhausted
+    pool_recycle=1800,  # Replace connections before server/proxy idle timeouts
+    insertmanyvalues_page_size=1000,  # Rows per batched INSERT in executemany
+    connect_args={
+        # asyncpg's server-side prepared statements and SQLAlchemy's
+        # adapter-side cache, so hot queries skip parse/plan
+        "statement_cache_size": 1024,
+        "prepared_statement_cache_size": 1024,
+        # Our queries are short OLTP lookups; JIT only adds startup cost
+        "server_settings": {"jit": "off", "application_name": "kubot"},
+    },
 )
 
 # Create async session factory
@@ -24,7 +36,7 @@ SessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
-    autoflush=True,
+    autoflush=False,  # Repositories commit right after add(); no implicit flush before reads
     autocommit=False,
 )
 
@@ -50,6 +62,19 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def get_ro_session() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get a session for read-only endpoints.
+    
+    The connection runs in AUTOCOMMIT, so each SELECT is its own statement
+    with no BEGIN/COMMIT round-trips and no snapshot held between them.
+    Nothing is committed on exit; don't use this session for writes.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        async with AsyncSession(bind=conn, expire_on_commit=False, autoflush=False) as session:
+            yield session
+
+
 @asynccontextmanager
 async def get_session_context():
     """Async context manager for database sessions (use outside FastAPI DI)."""
@@ -64,7 +89,16 @@ async def get_session_context():
             await session.close()
 
 
+async def _open_pooled_connection():
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
 async def init_db():
-    """Initialize database tables."""
+    """Initialize database tables and pre-open the connection pool."""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+    
+    # Open pool_size connections up front so the asyncpg handshake and type
+    # introspection happen at startup rather than on the first requests
+    await asyncio.gather(*(_open_pooled_connection() for _ in range(engine.pool.size())))
\ No newline at end of file
@@ -2,9 +2,10 @@
 Populate banks table with initial data
 """
 import asyncio
-import asyncio
 
-from core.repos import BankRatesRepo
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.models import Bank
 from infrastructure.db import SessionLocal
 
 # Bank configurations from commercial_banks.py
@@ -69,24 +70,30 @@ BANKS = [
 async def populate_banks():
     """Populate banks table with initial data."""
     async with SessionLocal() as session:
-        repo = BankRatesRepo(session)
-        
         print("Populating banks...")
+        # One INSERT for every bank; existing slugs are left untouched
+        stmt = (
+            pg_insert(Bank)
+            .values(BANKS)
+            .on_conflict_do_nothing(index_elements=['slug'])
+            .returning(Bank.id, Bank.slug)
+        )
+        try:
+            result = await session.execute(stmt)
+            created = {slug: bank_id for bank_id, slug in result.all()}
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            print(f"  ❌ Error populating banks: {e}")
+            return
+        
         for bank_data in BANKS:
-            try:
-                # Check if bank already exists
-                existing = await repo.get_bank_by_slug(bank_data["slug"])
-                if existing:
-                    print(f"  ✓ Bank already exists: {bank_data['name']}")
-                    continue
-                
-                # Create new bank
-                bank = await repo.create_bank(**bank_data)
-                print(f"  ✅ Created: {bank_data['name']} (ID: {bank.id})")
-            except Exception as e:
-                print(f"  ❌ Error creating {bank_data['name']}: {e}")
+            bank_id = created.get(bank_data["slug"])
+            if bank_id is None:
+                print(f"  ✓ Bank already exists: {bank_data['name']}")
+            else:
+                print(f"  ✅ Created: {bank_data['name']} (ID: {bank_id})")
         
-        await session.commit()
         print("\n✅ Banks population complete!")
 
 
@@ -96,4 +103,9 @@ if __name__ == "__main__":
     print("=" * 60)
     print()
     
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(populate_banks())
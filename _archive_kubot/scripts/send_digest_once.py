@@ -89,5 +89,10 @@ if __name__ == "__main__":
         sys.exit(1)
     
     # Run the script
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     exit_code = asyncio.run(main())
     sys.exit(exit_code)
\ No newline at end of file
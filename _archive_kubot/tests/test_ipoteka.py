@@ -0,0 +1,27 @@
+"""Tests for the Ipoteka Bank HTML parser."""
+from collectors.ipoteka import parse_ipoteka_html
+
+
+def _row(code: str, buy: str | None, sell: str | None) -> str:
+    cells = [f"<td><b>{code}</b></td>"]
+    for value in (buy, sell):
+        cells.append(f"<td><div><span>{value}</span></div></td>" if value else "<td>-</td>")
+    return "<tr>" + "".join(cells) + "</tr>"
+
+
+def test_parses_each_row_independently():
+    html = "<table>" + _row("USD", "12 065", "12 200") + _row("EUR", "13 100", "13 300") + "</table>"
+
+    assert parse_ipoteka_html(html) == [("USD", 12065.0, 12200.0), ("EUR", 13100.0, 13300.0)]
+
+
+def test_row_without_spans_does_not_take_next_rows_numbers():
+    html = "<table>" + _row("USD", None, None) + _row("EUR", "13 100", "13 300") + "</table>"
+
+    assert parse_ipoteka_html(html) == [("EUR", 13100.0, 13300.0)]
+
+
+def test_currency_code_is_case_insensitive():
+    html = "<table>" + _row("usd", "12 065", "12 200") + "</table>"
+
+    assert parse_ipoteka_html(html) == [("USD", 12065.0, 12200.0)]
@@ -0,0 +1,41 @@
+"""Tests for repository query behaviour."""
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from core.repos import BankRatesRepo
+
+
+async def _seed_rate(db_session, sample_bank_data, sample_rate_data):
+    """Create a bank with one rate and detach them so queries load fresh rows."""
+    repo = BankRatesRepo(db_session)
+    bank = await repo.create_bank(**sample_bank_data)
+    await repo.add_rate(bank.id, **sample_rate_data)
+    db_session.expunge_all()
+    return repo, bank.id
+
+
+async def test_latest_by_code_forbids_lazy_loads(db_session, sample_bank_data, sample_rate_data):
+    """Only rate.bank is eager-loaded; any other relationship raises instead of querying."""
+    repo, bank_id = await _seed_rate(db_session, sample_bank_data, sample_rate_data)
+
+    rates = await repo.latest_by_code(sample_rate_data["code"])
+    rate = next(r for r in rates if r.bank_id == bank_id)
+
+    assert rate.bank.slug == sample_bank_data["slug"]
+    with pytest.raises(InvalidRequestError):
+        rate.bank.rates
+
+
+async def test_latest_by_codes_forbids_lazy_loads(db_session, sample_bank_data, sample_rate_data):
+    """latest_by_codes applies the same loader options as latest_by_code."""
+    repo, bank_id = await _seed_rate(
+        db_session, {**sample_bank_data, "slug": "test_bank_codes"}, sample_rate_data
+    )
+
+    grouped = await repo.latest_by_codes([sample_rate_data["code"]])
+    rate = next(r for r in grouped[sample_rate_data["code"]] if r.bank_id == bank_id)
+
+    assert rate.bank.name == sample_bank_data["name"]
+    with pytest.raises(InvalidRequestError):
+        rate.bank.rates
+